@@ -10,5 +10,6 @@
 #
 
 from autoslug.fields import AutoSlugField
+from autoslug.utils import reservations
 
-__all__ = ['AutoSlugField']
+__all__ = ['AutoSlugField', 'reservations']
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright (c) 2008—2012 Andy Mikhailenko
+#
+#  This file is part of django-autoslug.
+#
+#  django-autoslug is free software under terms of the GNU Lesser
+#  General Public License version 3 (LGPLv3) as published by the Free
+#  Software Foundation. See the file README for copying conditions.
+#
+"""
+Counterparts of :mod:`autoslug.utils` that use the asynchronous queryset API
+(Django 4.1+), so that slugs can be generated on the event loop.
+
+This module requires Python 3.5+ and is only loaded if it can be imported.
+"""
+
+# django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import SynchronousOnlyOperation
+
+# this app
+from autoslug import backends, utils
+
+
+async def apre_populate(field, instance, add=None):
+    """
+    Fills the field like `AutoSlugField.pre_save()` would, but awaits the
+    uniqueness queries instead of blocking. The subsequent `save()` uses the
+    slug as is unless it has been changed in the meantime. Returns the slug.
+
+    Fields with the ``optimistic`` strategy do not query the database before
+    saving anyway; they are left for `pre_save()` and ``None`` is returned.
+    So are fields with a backend that locks slugs (e.g. the ``lock``
+    strategy), which must pick the slug in the transaction the object is
+    saved in.
+    The ``counter`` strategy needs a transaction and is run in a thread.
+    """
+    if add is None:
+        add = instance._state.adding
+
+    prepared = field._get_slugs_to_check(instance, add)
+    if prepared is None:
+        return field.value_from_object(instance)
+    slugs, fingerprint = prepared
+
+    if field.strategy == 'optimistic' or field.get_backend().locks_slugs:
+        return None
+    elif field.unique or field.unique_with:
+        slug = await agenerate_unique_slug(field, instance, slugs, field.manager)
+    else:
+        slug = slugs[0]
+
+    slug = field._set_slug(instance, slug, fingerprint)
+    instance.__dict__.setdefault('_autoslug_populated', {})[field.attname] = slug
+    return slug
+
+
+async def agenerate_unique_slug(field, instance, slugs, manager):
+    """
+    Asynchronous version of :func:`autoslug.utils.generate_unique_slug`.
+    Backends other than the shipped ones that query the database are run
+    in a thread, and so is :func:`autoslug.utils.reserve_in_cache`.
+    """
+    backend = field.get_backend()
+    if type(backend) not in (backends.LinearBackend, backends.PrefixBackend,
+                             backends.GallopBackend, backends.CounterBackend):
+        generate = sync_to_async(utils.generate_unique_slug)
+        return await generate(field, instance, slugs, manager)
+
+    default_lookups = await aget_uniqueness_lookups(field, instance)
+
+    if not manager:
+        manager = type(instance).objects
+
+    slugs = [utils.crop_slug(field, slug) for slug in slugs]
+    slug = await aallocate_slug(field, instance, slugs, manager, backend,
+                                default_lookups)
+
+    if getattr(settings, 'AUTOSLUG_RESERVATION_CACHE', None):
+        reserve = sync_to_async(utils.reserve_in_cache)
+        slug = await reserve(field, instance, slugs, slug, manager, default_lookups)
+    return slug
+
+
+async def aallocate_slug(field, instance, slugs, manager, backend, default_lookups):
+    """
+    Picks a unique slug like the `allocate()` method of given shipped backend
+    does.
+    """
+    rivals = manager.filter(**dict(default_lookups)).exclude(pk=instance.pk)
+    name = field.name
+
+    taken = set(await alist(rivals.filter(**{'%s__in' % name: slugs})
+                                  .values_list(name, flat=True).distinct()))
+    utils.record_cost(instance, queries=1)
+
+    for slug in slugs:
+        if slug not in taken:
+            return slug
+        elif field.unique_warning:
+            await awarn_slug_taken(instance, slug, rivals.filter(**{name: slug}))
+
+    # none is unique; add an index to the first one
+    original_slug = slugs[0]
+
+    if type(backend) is backends.PrefixBackend:
+        return await ascan_for_unique_slug(field, instance, original_slug, rivals)
+    if type(backend) is backends.CounterBackend:
+        count = sync_to_async(utils.count_unique_slug)
+        return await count(field, instance, original_slug, manager, default_lookups)
+    if type(backend) is backends.GallopBackend:
+        return await agallop_for_unique_slug(field, instance, original_slug, rivals)
+
+    index = 2
+    while True:
+        slug = utils.get_indexed_slug(field, original_slug, index)
+        slug_rivals = rivals.filter(**{name: slug})
+        utils.record_cost(instance, queries=1, iterations=1)
+
+        if not await slug_rivals.aexists():
+            utils.record_cost(instance, index=index)
+            return slug
+        elif field.unique_warning:
+            await awarn_slug_taken(instance, slug, slug_rivals)
+
+        index += 1
+
+
+async def ascan_for_unique_slug(field, instance, slug, rivals):
+    """
+    Asynchronous version of :func:`autoslug.utils.scan_for_unique_slug`.
+    """
+    name = field.name
+
+    index = 2
+    prefix = utils.get_indexed_slug(field, slug, index)[:-len(str(index))]
+    known_prefixes = set([prefix])
+
+    lookup = {'%s__startswith' % name: prefix}
+    taken = set(await alist(rivals.filter(**lookup).values_list(name, flat=True)))
+    utils.record_cost(instance, queries=1)
+
+    while True:
+        candidate = utils.get_indexed_slug(field, slug, index)
+        prefix = candidate[:-len(str(index))]
+        if prefix not in known_prefixes:
+            # the base was cropped to fit the index; fetch the new family
+            known_prefixes.add(prefix)
+            lookup = {'%s__startswith' % name: prefix}
+            taken.update(await alist(rivals.filter(**lookup).values_list(name, flat=True)))
+            utils.record_cost(instance, queries=1)
+        utils.record_cost(instance, iterations=1)
+        if candidate not in taken:
+            utils.record_cost(instance, index=index)
+            return candidate
+        index += 1
+
+
+async def agallop_for_unique_slug(field, instance, slug, rivals):
+    """
+    Asynchronous version of :func:`autoslug.utils.gallop_for_unique_slug`.
+    """
+    name = field.name
+
+    search = utils.GallopingSearch(field, slug)
+    while search.result is None:
+        candidates = search.get_candidates()
+        lookup = {'%s__in' % name: candidates}
+        search.update(await alist(rivals.filter(**lookup).values_list(name, flat=True)))
+        utils.record_cost(instance, queries=1, iterations=len(candidates))
+    index, slug = search.result
+    utils.record_cost(instance, index=index)
+    return slug
+
+
+async def aget_uniqueness_lookups(field, instance):
+    """
+    Returns the lookups from :func:`autoslug.utils.get_uniqueness_lookups`
+    as a tuple. These are normally computed without querying the database;
+    if a related object has to be fetched after all, it is done in a thread.
+    """
+    def get_lookups():
+        return tuple(utils.get_uniqueness_lookups(field, instance, field.unique_with))
+    try:
+        return get_lookups()
+    except SynchronousOnlyOperation:
+        return await sync_to_async(get_lookups)()
+
+
+async def awarn_slug_taken(instance, slug, rivals):
+    """
+    Asynchronous version of :func:`autoslug.utils.warn_slug_taken`.
+    """
+    if not utils.is_warning_shown(UserWarning):
+        return
+    pks = await alist(rivals.values_list('pk', flat=True)[:utils.MAX_RIVALS_IN_WARNING + 1])
+    utils.record_cost(instance, queries=1)
+    utils.warn_slug_used(instance, slug, pks)
+
+
+async def alist(queryset):
+    # no asynchronous comprehensions in Python 3.5
+    items = []
+    async for item in queryset:
+        items.append(item)
+    return items
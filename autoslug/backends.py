@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright (c) 2008—2012 Andy Mikhailenko
+#
+#  This file is part of django-autoslug.
+#
+#  django-autoslug is free software under terms of the GNU Lesser
+#  General Public License version 3 (LGPLv3) as published by the Free
+#  Software Foundation. See the file README for copying conditions.
+#
+"""
+Backends pick a unique slug for an object given the candidate slugs and the
+uniqueness scope. Each :class:`~autoslug.fields.AutoSlugField` uses the
+backend of its `strategy` unless another one is given as `backend` (per
+field) or as ``AUTOSLUG_BACKEND`` (for fields without an explicit
+`strategy`, see :doc:`settings`). The value may be a backend instance,
+a class or the dotted path to one, e.g.::
+
+    slug = AutoSlugField(populate_from='title', unique=True,
+                         backend='autoslug.backends.PrefixBackend')
+
+A custom backend subclasses :class:`SlugBackend` and implements
+:meth:`~SlugBackend.allocate`; most of them only need to subclass
+:class:`LinearBackend` and override :meth:`~LinearBackend.index_slug`.
+"""
+# python
+from contextlib import contextmanager
+from itertools import islice
+
+# django
+from django.conf import settings
+from django.db.models.signals import post_delete
+try:
+    from django.urls import get_callable
+except ImportError:    # Django < 1.10
+    from django.core.urlresolvers import get_callable
+
+# this package
+from autoslug import utils
+
+try:                 # pragma: nocover
+    # Python 2.x
+    basestring
+except NameError:    # pragma: nocover
+    # Python 3.x
+    basestring = str
+
+__all__ = ['SlugBackend', 'LinearBackend', 'PrefixBackend', 'GallopBackend',
+           'CounterBackend', 'LockBackend', 'MemoryBackend', 'override_backend']
+
+
+class SlugBackend(object):
+    """
+    Base class for backends.
+    """
+    # whether reservations() may pick the slugs instead of the backend
+    uses_reservations = True
+
+    # whether slugs are picked in the transaction the object is saved in
+    # (see autoslug.utils.lock_slug_allocation)
+    locks_slugs = False
+
+    def allocate(self, field, instance, candidates, scope):
+        """
+        Returns a slug for given instance that no other object within the
+        scope uses: the first free one of `candidates` (already cropped to
+        fit the field) or the first candidate with an index appended (see
+        :func:`autoslug.utils.get_indexed_slug`). `scope` is a tuple of
+        ``(lookup, value)`` pairs (see
+        :func:`autoslug.utils.get_uniqueness_lookups`).
+        """
+        raise NotImplementedError
+
+    def get_manager(self, field, instance):
+        return field.manager or type(instance).objects
+
+
+class LinearBackend(SlugBackend):
+    """
+    Checks all candidates with a single ``slug IN (...)`` query and then
+    tries "foo-2", "foo-3" etc. one query at a time.
+    """
+    def allocate(self, field, instance, candidates, scope):
+        manager = self.get_manager(field, instance)
+        rivals = manager.filter(**dict(scope)).exclude(pk=instance.pk)
+        name = field.name
+
+        taken = set(rivals.filter(**{'%s__in' % name: candidates})
+                          .values_list(name, flat=True).distinct())
+        utils.record_cost(instance, queries=1)
+
+        for slug in candidates:
+            if slug not in taken:
+                # the slug is unique, no model uses it
+                return slug
+            elif field.unique_warning:
+                utils.warn_slug_taken(instance, slug, rivals.filter(**{name: slug}))
+
+        # none is unique; add an index to the first one
+        return self.index_slug(field, instance, candidates[0], scope)
+
+    def index_slug(self, field, instance, slug, scope):
+        """
+        Returns given (taken) slug with a free index appended.
+        """
+        rivals = self.get_manager(field, instance).filter(**dict(scope))
+        rivals = rivals.exclude(pk=instance.pk)
+        name = field.name
+
+        # keep changing the slug until it is unique
+        index = 2
+        while True:
+            indexed_slug = utils.get_indexed_slug(field, slug, index)
+            slug_rivals = rivals.filter(**{name: indexed_slug})
+            utils.record_cost(instance, queries=1, iterations=1)
+
+            if not slug_rivals.exists():
+                utils.record_cost(instance, index=index)
+                return indexed_slug
+            elif field.unique_warning:
+                utils.warn_slug_taken(instance, indexed_slug, slug_rivals)
+
+            # the slug is not unique; change once more
+            index += 1
+
+
+class PrefixBackend(LinearBackend):
+    """
+    Fetches all slugs starting with the taken one at once and picks the
+    lowest free index in Python (see
+    :func:`autoslug.utils.scan_for_unique_slug`).
+    """
+    def index_slug(self, field, instance, slug, scope):
+        return utils.scan_for_unique_slug(field, instance, slug,
+                                          self.get_manager(field, instance), scope)
+
+
+class GallopBackend(LinearBackend):
+    """
+    Finds a free index with batches of ``slug IN (...)`` queries (see
+    :class:`autoslug.utils.GallopingSearch`).
+    """
+    def index_slug(self, field, instance, slug, scope):
+        return utils.gallop_for_unique_slug(field, instance, slug,
+                                            self.get_manager(field, instance), scope)
+
+
+class CounterBackend(LinearBackend):
+    """
+    Takes the next index from a :class:`~autoslug.models.SlugCounter` (see
+    :func:`autoslug.utils.count_unique_slug`).
+    """
+    uses_reservations = False
+
+    def index_slug(self, field, instance, slug, scope):
+        return utils.count_unique_slug(field, instance, slug,
+                                       self.get_manager(field, instance), scope)
+
+
+class LockBackend(PrefixBackend):
+    """
+    Locks the candidates within the scope until the object is saved (see
+    :func:`autoslug.utils.lock_slugs`) and then works like
+    :class:`PrefixBackend`, however it is chosen (``strategy='lock'``,
+    `backend` or the settings). The process-local locks used on databases
+    other than PostgreSQL do not protect saves within an outer transaction.
+    """
+    uses_reservations = False
+    locks_slugs = True
+
+    def allocate(self, field, instance, candidates, scope):
+        manager = self.get_manager(field, instance)
+        utils.lock_slugs(field, instance, candidates, scope, manager.db)
+        return super(LockBackend, self).allocate(field, instance, candidates, scope)
+
+
+class MemoryBackend(SlugBackend):
+    """
+    Keeps the taken slugs in memory per model, field and scope and picks
+    slugs exactly like :class:`LinearBackend` does (including the indices
+    and the cropping to ``max_length``) without querying the database at
+    all, e.g. to speed up tests (see :func:`override_backend`).
+
+    The backend only knows the slugs it has allocated itself or registered
+    with :meth:`seed`; deleting objects frees their slugs. Objects saved
+    otherwise (fixtures, `bulk_create`, other processes) do not count as
+    rivals and rolled back transactions are not noticed. Call :meth:`reset`
+    to start from scratch, e.g. when the test database is flushed.
+
+    Scopes that span a foreign key are told apart by the value of the key,
+    e.g. with ``unique_with='author__name'`` objects of two authors with the
+    same name may get the same slug.
+    """
+    uses_reservations = False
+
+    def __init__(self):
+        self.registries = {}
+        post_delete.connect(self.forget)
+
+    def allocate(self, field, instance, candidates, scope):
+        registry = self.get_registry(field, instance)
+        if instance.pk is not None:
+            registry.claim(instance.pk, field.value_from_object(instance))
+        slug = registry.allocate(instance.pk, candidates)
+        if slug not in candidates:
+            utils.record_cost(instance, index=registry.indices[candidates[0]])
+        return slug
+
+    def get_registry(self, field, instance):
+        key = self.get_registry_key(field, instance)
+        registry = self.registries.get(key)
+        if registry is None:
+            manager = self.get_manager(field, instance)
+            registry = self.registries[key] = utils.SlugRegistry(field, manager.none())
+        return registry
+
+    def get_registry_key(self, field, instance):
+        # the scope is taken from the columns of the instance; the values of
+        # related objects would take a query each
+        scope = utils.get_uniqueness_lookups(field, instance, field.unique_with,
+                                             local=True)
+        return (utils.get_model_label(field.model), field.name,
+                utils.get_scope_key(scope))
+
+    def seed(self, model, chunk_size=1000):
+        """
+        Registers the slugs of existing rows of given model (or queryset)
+        for all of its AutoSlugFields that must be unique, e.g. after loading
+        fixtures. Returns the number of registered slugs.
+        """
+        queryset = model
+        if not hasattr(queryset, 'iterator'):
+            queryset = model._default_manager.all()
+        fields = [f for f in get_slug_fields(queryset.model)
+                  if f.unique or f.unique_with]
+        rows = queryset.order_by('pk').iterator()
+        count = 0
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return count
+            for field in fields:
+                for instance in chunk:
+                    slug = field.value_from_object(instance)
+                    if not slug:
+                        continue
+                    registry = self.get_registry(field, instance)
+                    registry.register(instance.pk, slug)
+                    count += 1
+
+    def forget(self, sender, instance, **kwargs):
+        """
+        Frees the slugs of a deleted object (receiver of `post_delete`).
+        """
+        if not self.registries:
+            return
+        for field in get_slug_fields(type(instance)):
+            try:
+                key = self.get_registry_key(field, instance)
+            except ValueError:
+                # e.g. a field of the scope is empty
+                continue
+            registry = self.registries.get(key)
+            if registry is not None:
+                registry.claim(instance.pk, field.value_from_object(instance))
+                registry.release(instance.pk)
+
+    def reset(self):
+        """
+        Forgets all slugs.
+        """
+        self.registries.clear()
+
+
+# backends of the strategies of AutoSlugField (the "optimistic" strategy
+# only looks up a free slug after several failed attempts to save)
+STRATEGY_BACKENDS = {
+    'linear': LinearBackend,
+    'prefix': PrefixBackend,
+    'optimistic': PrefixBackend,
+    'counter': CounterBackend,
+    'gallop': GallopBackend,
+    'lock': LockBackend,
+}
+
+def get_slug_fields(model):
+    from autoslug.fields import AutoSlugField
+    return [f for f in model._meta.fields if isinstance(f, AutoSlugField)]
+
+
+# instances of backends given as classes or paths
+_backends = {}
+
+
+# backends set by override_backend(), the innermost one being the last
+_overrides = []
+
+
+@contextmanager
+def override_backend(backend=None):
+    """
+    Makes all AutoSlugFields use given backend (a fresh
+    :class:`MemoryBackend` by default) within the block, regardless of their
+    `strategy` or `backend`, e.g. in tests::
+
+        with override_backend() as backend:
+            backend.seed(Article)
+            ...
+
+    The same can be done for the whole test run with the
+    ``AUTOSLUG_FORCE_BACKEND`` setting (see :doc:`settings`). The override
+    applies to all threads.
+    """
+    if backend is None:
+        backend = MemoryBackend()
+    backend = load_backend(backend)
+    _overrides.append(backend)
+    try:
+        yield backend
+    finally:
+        _overrides.remove(backend)
+
+
+def get_backend(field):
+    """
+    Returns the backend instance for given field.
+    """
+    if _overrides:
+        return _overrides[-1]
+    backend = getattr(settings, 'AUTOSLUG_FORCE_BACKEND', None)
+    if backend is not None:
+        return load_backend(backend)
+    backend = field.backend
+    if backend is None and not field.strategy_given:
+        backend = getattr(settings, 'AUTOSLUG_BACKEND', None)
+    if backend is None:
+        backend = STRATEGY_BACKENDS[field.strategy]
+    return load_backend(backend)
+
+
+def load_backend(backend):
+    """
+    Returns given backend instance as is or an instance of given backend
+    class or of the class at given dotted path. Instances of classes are
+    shared.
+    """
+    if isinstance(backend, SlugBackend):
+        return backend
+    try:
+        return _backends[backend]
+    except KeyError:
+        pass
+    cls = backend
+    if isinstance(backend, basestring):
+        cls = get_callable(backend)
+    instance = _backends[backend] = cls()
+    return instance
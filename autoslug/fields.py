@@ -11,6 +11,11 @@
 
 # django
 from django.db.models.fields import SlugField
+try:
+    from django.core.exceptions import FieldDoesNotExist
+except ImportError:    # Django < 1.8
+    from django.db.models.fields import FieldDoesNotExist
+from django.db.models.signals import class_prepared, post_init
 
 # 3rd-party
 try:
@@ -20,7 +25,8 @@ except ImportError:
 
 # this app
 from autoslug.settings import slugify
-from autoslug import utils
+from autoslug import backends, signals, utils
+from time import time
 from warnings import warn
 
 
@@ -59,7 +65,11 @@ class AutoSlugField(SlugField):
         model instance is saved. Use with care because `cool URIs don't
         change`_ (and the slug is usually a part of object's URI). Note that
         even if the field is editable, any manual changes will be lost when
-        this option is activated.
+        this option is activated. The slug is not regenerated (and the database
+        is not queried) if neither the value of `populate_from` nor the fields
+        listed in `unique_with` have changed since the instance was loaded
+        or last saved. For callable `populate_from` this check only applies
+        after the instance has been saved once.
     :param populate_from: string, list, tuple or callable: if string is given, it is considered
         as the name of attribute from which to fill the slug. If callable is given,
         it should accept `instance` parameter and return a value to fill the slug
@@ -70,6 +80,12 @@ class AutoSlugField(SlugField):
         incremented slug index (i.e. the "-" in "foo-2").
     :param slugify: callable: if defined, overrides `AUTOSLUG_SLUGIFY_FUNCTION`
         defined in :doc:`settings`.
+    :param slugify_cache: boolean, integer or
+        :class:`~autoslug.utils.SlugifyCache`: if given, slugified values are
+        cached (up to given number of values, 1024 if ``True``) so that
+        frequently repeated values are only slugified once. A `SlugifyCache`
+        instance can be shared by several fields. See also
+        `AUTOSLUG_SLUGIFY_CACHE` in :doc:`settings`.
     :param unique: boolean: ensure total slug uniqueness (unless more precise
         `unique_with` is defined).
     :param unique_with: string or tuple of strings: name or names of attributes
@@ -82,8 +98,55 @@ class AutoSlugField(SlugField):
         reappear within a day or within some author's articles but never within
         a day for the same author. Foreign keys are also supported, i.e. not only
         `unique_with='author'` will do, but also `unique_with='author__name'`.
+    :param unique_with_index: boolean or ``'unique'``, default = False: if
+        True, a composite index on the `unique_with` columns and the slug is
+        added to the model, so that looking for rivals is a single index
+        seek. Columns compared for equality go first, then the slug, then
+        date columns looked up by range (e.g. ``'pub_date__month'``);
+        lookups that span relations (``'author__name'``) are not covered.
+        Requires Django 1.5 or newer; on Django 1.7+ the index is part of
+        the model state, so ``makemigrations`` generates it like any index
+        declared in `Meta`. ``'unique'`` adds the columns to
+        `unique_together` instead, so that the database enforces the
+        scoped uniqueness; this is only possible if every item of
+        `unique_with` is a column compared for equality (e.g. ``'author'``
+        or ``'pub_date'`` of a `DateField`).
     :param unique_warning: boolean, default = True: if True, warning when slug is 
         not unique 
+    :param strategy: string, default = ``'linear'``: how to find a free index
+        when the slug is taken. ``'linear'`` checks "foo-2", "foo-3" etc. with
+        one query each; ``'prefix'`` fetches all slugs starting with "foo" in
+        a single query and picks the first free index in Python. The latter
+        is much cheaper for slugs that already have many numbered copies.
+        ``'optimistic'`` does not query the database before saving; instead,
+        if the unique constraint is violated, the save is rolled back to
+        a savepoint and retried with the next slug ("foo", "foo-2", ...). This
+        requires an actual unique constraint and is therefore not compatible
+        with `unique_with`. Note that ``pre_save`` signals are sent again on
+        each retry. ``'counter'`` keeps the highest index of each slug in
+        a table (see :class:`autoslug.models.SlugCounter`) and takes the next
+        one with a single ``UPDATE``; indices of deleted objects are not
+        reused. It requires ``autoslug`` in ``INSTALLED_APPS`` and its table
+        created with ``manage.py migrate`` (``syncdb`` before Django 1.7);
+        counters can be rebuilt with ``manage.py autoslug_rebuild_counters``. ``'gallop'``
+        checks indices 2, 3, 5, 9 etc. and then narrows down the range
+        between the last taken and the first free one, checking up to 20
+        slugs with each ``slug IN (...)`` query; use it if ``LIKE 'foo%'``
+        does not use the index of the column. It may skip indices freed by
+        deleted objects.
+        ``'lock'`` works like ``'prefix'`` but first locks the candidate
+        slugs within the scope until the object is saved, so that concurrent
+        saves of objects with the same slug do not pick the same index (which
+        is silently saved with `unique_with`, as there is no constraint). It
+        uses advisory locks on PostgreSQL and process-local locks elsewhere.
+        Process-local locks are released as soon as the object is saved,
+        i.e. before an enclosing transaction (e.g. ``ATOMIC_REQUESTS``) is
+        committed, so they only serialize saves made outside of one.
+        If no strategy is given, ``AUTOSLUG_BACKEND`` is used if defined
+        (see :doc:`settings`).
+    :param backend: a :class:`~autoslug.backends.SlugBackend` instance or
+        class or the dotted path to one: picks a unique slug instead of the
+        backend of the `strategy`, see :mod:`autoslug.backends`.
 
     .. _cool URIs don't change: http://w3.org/Provider/Style/URI.html
 
@@ -92,6 +155,13 @@ class AutoSlugField(SlugField):
         `unique_with`). The reasoning is that autosaved dates and other such
         fields must be already processed before using them in the AutoSlugField.
 
+    In asynchronous code (Python 3.5+, Django 4.1+) the slug can be generated
+    on the event loop before saving, so that `pre_save` has nothing left to
+    query (see :mod:`autoslug.async_utils`)::
+
+        await Article._meta.get_field('slug').apre_populate(article)
+        await article.asave()
+
     Example usage::
 
         from django.db import models
@@ -148,6 +218,10 @@ class AutoSlugField(SlugField):
         # (ex. usage: user profile models)
         slug = AutoSlugField(populate_from=lambda instance: instance.user.get_full_name())
 
+        # find a free index with one query even if there are hundreds of
+        # "foo-N" slugs already
+        slug = AutoSlugField(populate_from='title', unique=True, strategy='prefix')
+
         # specify model manager for looking up slugs shared by subclasses
 
         class Article(models.Model):
@@ -184,6 +258,14 @@ class AutoSlugField(SlugField):
         self.slugify = kwargs.pop('slugify', slugify)
         assert hasattr(self.slugify, '__call__')
 
+        slugify_cache = kwargs.pop('slugify_cache', None)
+        if isinstance(slugify_cache, utils.SlugifyCache):
+            self.slugify = slugify_cache
+        elif slugify_cache is True:
+            self.slugify = utils.SlugifyCache(self.slugify)
+        elif slugify_cache:
+            self.slugify = utils.SlugifyCache(self.slugify, slugify_cache)
+
         self.index_sep = kwargs.pop('sep', SLUG_INDEX_SEPARATOR)
 
         # backward compatibility
@@ -209,14 +291,216 @@ class AutoSlugField(SlugField):
 
         self.unique_warning = kwargs.pop('unique_warning', True)
 
+        self.unique_with_index = kwargs.pop('unique_with_index', False)
+        if self.unique_with_index not in (False, True, 'unique'):
+            raise ValueError('AutoSlugField unique_with_index must be True,'
+                             ' False or "unique", got "%s"' % self.unique_with_index)
+
+        # `unique_with` resolved per model, see utils.get_uniqueness_plan()
+        self._uniqueness_plans = {}
+
+        self.strategy_given = 'strategy' in kwargs
+        self.strategy = kwargs.pop('strategy', 'linear')
+        if self.strategy not in utils.STRATEGIES:
+            raise ValueError('AutoSlugField strategy must be one of %s, got "%s"'
+                             % (', '.join(utils.STRATEGIES), self.strategy))
+        if self.strategy == 'optimistic' and not kwargs['unique']:
+            raise ValueError('AutoSlugField strategy "optimistic" relies on'
+                             ' the unique constraint and cannot be used with'
+                             ' unique=False or unique_with.')
+
+        # resolved on use, see get_backend()
+        self.backend = kwargs.pop('backend', None)
+
+        # names of attributes the slug depends on, per model (always_update)
+        self._fingerprint_names = {}
+
+        # SlugField.__init__() is skipped but its deconstruct() needs this
+        self.allow_unicode = kwargs.pop('allow_unicode', False)
+
         super(SlugField, self).__init__(*args, **kwargs)
 
+    def contribute_to_class(self, cls, name, *args, **kwargs):
+        super(AutoSlugField, self).contribute_to_class(cls, name, *args, **kwargs)
+        self.fingerprint_attname = '_%s_autoslug_fingerprint' % self.attname
+        if self.always_update:
+            post_init.connect(self._remember_fingerprint, sender=cls)
+        if self.strategy == 'optimistic':
+            save_base = cls.save_base
+            if not getattr(save_base, 'retries_on_slug_conflict', False):
+                cls.save_base = utils.retry_on_slug_conflict(save_base)
+        # the backend is only known on save, see get_backend()
+        save_base = cls.save_base
+        if not getattr(save_base, 'locks_slug_allocation', False):
+            cls.save_base = utils.lock_slug_allocation(save_base)
+        if self.unique_with_index and self.unique_with:
+            # the fields of unique_with may be declared later
+            class_prepared.connect(self._add_scope_index, sender=cls, weak=False)
+
+    def _add_scope_index(self, sender, **kwargs):
+        utils.add_scope_index(self, sender, unique=self.unique_with_index == 'unique')
+
+    def get_backend(self):
+        """
+        Returns the :class:`~autoslug.backends.SlugBackend` that picks unique
+        slugs for this field.
+        """
+        return backends.get_backend(self)
+
     def pre_save(self, instance, add):
+        if not signals.slug_generated.receivers:
+            return self._generate_slug(instance, add)
+
+        # measure the cost of the slug for the receivers
+        started = time()
+        instance._autoslug_stats = stats = utils.SlugStats()
+        try:
+            slug = self._generate_slug(instance, add)
+        finally:
+            del instance._autoslug_stats
+        if stats.generated:
+            signals.slug_generated.send(
+                sender=type(instance), instance=instance, field=self, slug=slug,
+                duration=time() - started, slugify_time=stats.slugify_time,
+                queries=stats.queries, iterations=stats.iterations,
+                index=stats.index)
+        return slug
+
+    def _generate_slug(self, instance, add):
+        populated = instance.__dict__.get('_autoslug_populated')
+        if populated and self.attname in populated:
+            # already done by apre_populate() unless changed since then
+            slug = populated.pop(self.attname)
+            if slug == self.value_from_object(instance):
+                return slug
+
+        prepared = self._get_slugs_to_check(instance, add)
+        if prepared is None:
+            return self.value_from_object(instance)
+        slugs, fingerprint = prepared
+
+        # ensure the slug is unique (if required)
+        if self.strategy == 'optimistic':
+            # the database will tell if it is not
+            slug = utils.get_optimistic_slug(self, instance, slugs)
+        elif self.unique or self.unique_with:
+            slug = utils.generate_unique_slug(self, instance, slugs, self.manager)
+        else:
+            slug = slugs[0]
+
+        return self._set_slug(instance, slug, fingerprint)
+
+    def _get_slugs_to_check(self, instance, add):
+        """
+        Returns the candidate slugs and the fingerprint of the instance (see
+        `_get_fingerprint`) or ``None`` if the slug is to be left as is.
+        """
+        fingerprint = None
+        if self.always_update:
+            # nothing to do if the slug sources have not changed since the
+            # instance was loaded or saved; instances built in memory (e.g.
+            # with the pk of an existing row) are remembered on init, too
+            fingerprint = self._get_fingerprint(instance)
+            if (not add and not instance._state.adding
+                    and fingerprint == instance.__dict__.get(self.fingerprint_attname)):
+                return None
+
+        slugs = self.get_candidate_slugs(instance)
+
+        if not slugs:
+            # the field has been set to an empty value (if allowed)
+            return None
+
+        return slugs, fingerprint
+
+    def _set_slug(self, instance, slug, fingerprint):
+        if not slug: 
+            warn (u'Failed to populate slug %s.%s from %s' % \
+                (instance._meta.object_name, self.name, self.populate_from))
+            return 
+
+        assert slug, 'value must be filled before saving'
+
+        if slug: 
+            # make the updated slug available as instance attribute
+            setattr(instance, self.name, slug)
+
+        if self.always_update:
+            instance.__dict__[self.fingerprint_attname] = fingerprint[:-1] + (slug,)
+
+        return slug
+
+    def populate_batch(self, instances, manager=None, related_objects=None,
+                       mapper=None):
+        """
+        Fills the field in all given instances at once, e.g. before passing
+        them to `QuerySet.bulk_create()` which does not call `pre_save()`.
+        The slugs are the same as if the instances were saved one by one in
+        given order, but the database is only queried once per `unique_with`
+        scope (rather than once per instance and index); collisions within
+        the batch are resolved in memory. Returns the list of instances.
+
+        Objects referenced by `unique_with` lookups such as ``"author__name"``
+        are fetched with one query per foreign key unless they are cached on
+        the instances or given in `related_objects`, a dictionary that maps
+        foreign key names to the results of `QuerySet.in_bulk()`.
+
+        Very large imports should be split into chunks of several thousand
+        instances.
+
+        `mapper` is a callable like the built-in `map()` that is used to
+        slugify the values, e.g. `multiprocessing.Pool.map` to slugify them
+        in parallel (the `slugify` function must then be picklable).
+        """
+        instances = list(instances)
+        if self.unique_with:
+            utils.prime_related_objects(self, instances, related_objects)
+        values = [self.get_candidate_values(instance) for instance in instances]
+        flat_values = [value for item in values for value in item]
+        slugified = iter(list((mapper or map)(self.slugify, flat_values)))
+        pending = []
+        for instance, item in zip(instances, values):
+            if not item:
+                continue
+            slugs = self._crop_slugs(instance, [next(slugified) for x in item])
+            if self.unique or self.unique_with:
+                pending.append((instance, slugs))
+            else:
+                setattr(instance, self.name, slugs[0])
+        utils.generate_unique_slugs(self, pending, manager or self.manager)
+        return instances
+
+    def get_candidate_slugs(self, instance):
+        """
+        Returns the list of slugs for given instance in order of preference,
+        slugified and cropped but not yet checked for uniqueness. An empty list
+        means that the field has been set to an empty value instead.
+        """
+        values = self.get_candidate_values(instance)
+
+        if not values:
+            return []
+
+        stats = instance.__dict__.get('_autoslug_stats')
+        if stats is None:
+            slugs = [self.slugify(value) for value in values]
+        else:
+            started = time()
+            slugs = [self.slugify(value) for value in values]
+            stats.slugify_time += time() - started
+            stats.generated = True
+
+        return self._crop_slugs(instance, slugs)
+
+    def get_candidate_values(self, instance):
+        """
+        Returns the list of values to slugify for given instance in order of
+        preference. An empty list means that the field has been set to an
+        empty value instead.
+        """
         # get actual value field
         value = self.value_from_object(instance)
 
-        manager = self.manager
-
         # if autopopulate
         if self.always_update or (self.populate_from and not value):
             # get prepopulated values
@@ -244,44 +528,87 @@ class AutoSlugField(SlugField):
                     setattr(instance, self.name, None)
                     warn (u'Failed to populate slug %s.%s from %s. Set null' % \
                         (instance._meta.object_name, self.name, self.populate_from))
-                    return None 
+                    return [] 
                 else: 
                     setattr(instance, self.name, u'')
                     warn (u'Failed to populate slug %s.%s from %s. Set blank' % \
                         (instance._meta.object_name, self.name, self.populate_from))
-                    return u'' 
+                    return [] 
             else: 
                 values = [instance._meta.module_name]
                 warn (u'Failed to populate slug %s.%s from %s. Set model name' % \
                     (instance._meta.object_name, self.name, self.populate_from))
 
-        slugs = [self.slugify(value) for value in values]
+        return values
 
+    def _crop_slugs(self, instance, slugs):
         if not slugs: 
             warn (u'Failed to populate slug %s.%s from %s' % \
                 (instance._meta.object_name, self.name, self.populate_from))
-            return 
+            return [] 
 
         assert slugs, 'slugs are defined before trying to ensure uniqueness'
 
-        slugs = [utils.crop_slug(self, slug) for slug in slugs]
-
-        # ensure the slug is unique (if required)
-        if self.unique or self.unique_with:
-            slug = utils.generate_unique_slug(self, instance, slugs, manager)
-
-        if not slug: 
-            warn (u'Failed to populate slug %s.%s from %s' % \
-                (instance._meta.object_name, self.name, self.populate_from))
-            return 
-
-        assert slug, 'value must be filled before saving'
-
-        if slug: 
-            # make the updated slug available as instance attribute
-            setattr(instance, self.name, slug)
+        return [utils.crop_slug(self, slug) for slug in slugs]
+
+    def _get_fingerprint_names(self, model):
+        """
+        Returns a tuple of two lists: names of attributes that hold the values
+        of `populate_from` (``None`` if it is not a model field, i.e. the value
+        cannot be known without calling something) and names of attributes
+        that hold the values of fields listed in `unique_with`.
+        """
+        try:
+            return self._fingerprint_names[model]
+        except KeyError:
+            pass
 
-        return slug
+        def get_attname(name):
+            try:
+                return model._meta.get_field(name).attname
+            except FieldDoesNotExist:
+                return None
+
+        source_names = None
+        if self.populate_from and not hasattr(self.populate_from, '__call__'):
+            names = self.populate_from
+            if isinstance(names, basestring):
+                names = [names]
+            # only plain fields; relations would have to be fetched
+            if all(get_attname(name) == name for name in names):
+                source_names = list(names)
+
+        scope_names = [get_attname(name.split('__')[0]) for name in self.unique_with]
+        scope_names = [name for name in scope_names if name]
+
+        names = self._fingerprint_names[model] = source_names, scope_names
+        return names
+
+    def _get_fingerprint(self, instance):
+        """
+        Returns a tuple of values that the slug depends on: the values of
+        `populate_from`, the local values of the `unique_with` fields (e.g.
+        ``author_id`` for ``author__name``) and the slug itself.
+        """
+        data = instance.__dict__
+        source_names, scope_names = self._get_fingerprint_names(type(instance))
+        if source_names is None:
+            sources = tuple(utils.get_prepopulated_value(self, instance))
+        else:
+            sources = tuple(data.get(name) for name in source_names)
+        scope = tuple(data.get(name) for name in scope_names)
+        return sources, scope, data.get(self.attname)
+
+    def _remember_fingerprint(self, sender, instance, **kwargs):
+        "Remembers what the slug depends on when the instance is loaded."
+        source_names, scope_names = self._get_fingerprint_names(sender)
+        if source_names is None:
+            return
+        for name in source_names + scope_names + [self.attname]:
+            if name not in instance.__dict__:
+                # deferred field; reading it would hit the database
+                return
+        instance.__dict__[self.fingerprint_attname] = self._get_fingerprint(instance)
 
     def south_field_triple(self):
         "Returns a suitable description of this field for South."
@@ -291,3 +618,12 @@ class AutoSlugField(SlugField):
             'unique_with': repr(self.unique_with)
         })
         return ('autoslug.fields.AutoSlugField', args, kwargs)
+
+
+# asynchronous API (Python 3.5+, Django 4.1+)
+try:
+    from autoslug.async_utils import apre_populate
+except (ImportError, SyntaxError):
+    pass
+else:
+    AutoSlugField.apre_populate = apre_populate
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright (c) 2008—2012 Andy Mikhailenko
+#
+#  This file is part of django-autoslug.
+#
+#  django-autoslug is free software under terms of the GNU Lesser
+#  General Public License version 3 (LGPLv3) as published by the Free
+#  Software Foundation. See the file README for copying conditions.
+#
+
+# python
+from optparse import make_option
+import sys
+
+# django
+from django.core.management.base import BaseCommand, CommandError
+
+# this package
+from autoslug import utils
+
+
+def make_option_list(options):
+    """
+    Converts options given as ``(name, kwargs)`` pairs for `argparse` to
+    `optparse` ones (for Django < 1.10).
+    """
+    option_list = []
+    for name, kwargs in options:
+        if kwargs.get('type') is int:
+            kwargs = dict(kwargs, type='int')
+        option_list.append(make_option(name, **kwargs))
+    return tuple(option_list)
+
+
+class FieldCommand(BaseCommand):
+    """
+    Base class for commands that deal with an AutoSlugField given by the
+    model label and the field name. Subclasses list their options in
+    `options` as ``(name, kwargs)`` pairs and convert them with
+    :func:`make_option_list` for older versions of Django.
+    """
+    args = '<app_label.ModelName> <field_name>'
+    options = ()
+
+    def add_arguments(self, parser):    # Django >= 1.8
+        parser.add_argument('model')
+        parser.add_argument('field')
+        for name, kwargs in self.options:
+            parser.add_argument(name, **kwargs)
+
+    def get_model_field(self, args, options):
+        """
+        Returns the model and the field given in the command line.
+        """
+        if 'model' in options:
+            args = options['model'], options['field']
+        if len(args) != 2:
+            raise CommandError('Expected arguments: %s' % self.args)
+        try:
+            return utils.get_model_field(*args)
+        except ValueError:
+            raise CommandError(sys.exc_info()[1])
+
+
+def save_slugs(field, manager, instances):
+    """
+    Writes the slugs of given instances to the database without saving the
+    instances, i.e. without sending save signals.
+    """
+    if hasattr(manager, 'bulk_update'):    # Django >= 2.2
+        manager.bulk_update(instances, [field.name])
+        return
+    for instance in instances:
+        manager.filter(pk=instance.pk).update(
+            **{field.name: getattr(instance, field.attname)})
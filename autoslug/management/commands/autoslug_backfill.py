@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright (c) 2008—2012 Andy Mikhailenko
+#
+#  This file is part of django-autoslug.
+#
+#  django-autoslug is free software under terms of the GNU Lesser
+#  General Public License version 3 (LGPLv3) as published by the Free
+#  Software Foundation. See the file README for copying conditions.
+#
+
+from __future__ import with_statement
+
+# python
+import os
+import pickle
+try:
+    import json
+except ImportError:    # Python < 2.6
+    from django.utils import simplejson as json
+try:
+    import multiprocessing
+except ImportError:    # Python < 2.6
+    multiprocessing = None
+
+# django
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+# this package
+from autoslug import utils
+from autoslug.management.base import FieldCommand, make_option_list, save_slugs
+
+
+DEFAULT_CHUNK_SIZE = 1000
+
+OPTIONS = (
+    ('--chunk-size', dict(type=int, dest='chunk_size', default=DEFAULT_CHUNK_SIZE,
+                          help='number of rows fetched and updated at once')),
+    ('--processes', dict(type=int, dest='processes', default=None,
+                         help='number of processes to slugify in (default: '
+                              'slugify in this process)')),
+    ('--checkpoint', dict(dest='checkpoint', default=None,
+                          help='file to save the progress to; an interrupted '
+                               'run is resumed from it')),
+)
+
+
+class Command(FieldCommand):
+    """
+    Fills empty slugs of existing rows, e.g. after adding an AutoSlugField
+    to a large table::
+
+        $ ./manage.py autoslug_backfill blog.Article slug --checkpoint=slugs.json
+
+    Rows are fetched in chunks ordered by primary key. The values are
+    slugified in this process or, with ``--processes=N``, in a pool of N
+    processes; collisions are resolved per `unique_with` scope like in
+    `AutoSlugField.populate_batch` and the slugs are written with
+    `bulk_update` (or one ``UPDATE`` per row in Django < 2.2), each
+    chunk in a single transaction (see :func:`autoslug.utils.atomic`). After
+    each chunk the last primary key is saved to the checkpoint file, if any;
+    the file is removed when the command finishes.
+    """
+    help = 'Fills empty slugs of existing rows.'
+    options = OPTIONS
+
+    if hasattr(BaseCommand, 'option_list'):    # Django < 1.10
+        option_list = BaseCommand.option_list + make_option_list(OPTIONS)
+
+    def handle(self, *args, **options):
+        model, field = self.get_model_field(args, options)
+
+        chunk_size = options.get('chunk_size') or DEFAULT_CHUNK_SIZE
+        checkpoint = Checkpoint(options.get('checkpoint'),
+                                [utils.get_model_label(model), field.name])
+
+        pool = get_pool(field, options.get('processes'))
+        try:
+            total = backfill(field, model, chunk_size, checkpoint,
+                             pool and pool.map, self.stdout)
+        finally:
+            if pool:
+                pool.terminate()
+        checkpoint.remove()
+        self.stdout.write('Filled %d slug(s) of %s.%s\n'
+                          % (total, model._meta.object_name, field.name))
+
+
+def backfill(field, model, chunk_size, checkpoint, mapper=None, stdout=None):
+    """
+    Fills empty slugs of given field chunk by chunk. Returns the number of
+    updated rows.
+    """
+    manager = field.manager or model._default_manager
+    name = field.name
+    empty = Q(**{name: ''})
+    if field.null:
+        empty |= Q(**{'%s__isnull' % name: True})
+    rows = manager.filter(empty).order_by('pk')
+
+    last_pk, total = checkpoint.load()
+    while True:
+        chunk = rows if last_pk is None else rows.filter(pk__gt=last_pk)
+        instances = list(chunk[:chunk_size].iterator())
+        if not instances:
+            return total
+        field.populate_batch(instances, manager=manager, mapper=mapper)
+        filled = [x for x in instances if getattr(x, field.attname)]
+        with utils.atomic(manager.db):
+            save_slugs(field, manager, filled)
+        last_pk = instances[-1].pk
+        total += len(filled)
+        checkpoint.save(last_pk, total)
+        if stdout:
+            stdout.write('%d slug(s) filled, last primary key: %s\n'
+                         % (total, last_pk))
+
+
+def get_pool(field, processes):
+    """
+    Returns a pool of given number of processes to slugify the values in,
+    or ``None`` if the values should be slugified in this process (the
+    default).
+    """
+    if multiprocessing is None or processes is None or processes < 2:
+        return None
+    try:
+        pickle.dumps(field.slugify)
+    except Exception:
+        # e.g. a lambda or a SlugifyCache
+        return None
+    return multiprocessing.Pool(processes)
+
+
+class Checkpoint(object):
+    """
+    Stores the last processed primary key in a JSON file (if a path is
+    given) so that an interrupted backfill can be resumed.
+    """
+    def __init__(self, path, key):
+        self.path = path
+        self.key = list(key)
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return None, 0
+        with open(self.path) as f:
+            data = json.load(f)
+        if data.get('key') != self.key:
+            raise CommandError('Checkpoint %s belongs to %s' % (self.path, data.get('key')))
+        return data['last_pk'], data['total']
+
+    def save(self, last_pk, total):
+        if not self.path:
+            return
+        temp_path = '%s.tmp' % self.path
+        with open(temp_path, 'w') as f:
+            json.dump(dict(key=self.key, last_pk=last_pk, total=total), f,
+                      default=str)
+        os.rename(temp_path, self.path)
+
+    def remove(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright (c) 2008—2012 Andy Mikhailenko
+#
+#  This file is part of django-autoslug.
+#
+#  django-autoslug is free software under terms of the GNU Lesser
+#  General Public License version 3 (LGPLv3) as published by the Free
+#  Software Foundation. See the file README for copying conditions.
+#
+
+# django
+from django.core.management.base import CommandError
+
+# this package
+from autoslug import utils
+from autoslug.management.base import FieldCommand
+
+
+class Command(FieldCommand):
+    """
+    Rebuilds slug counters used by ``AutoSlugField(strategy='counter')``
+    from the slugs stored in the database, e.g. after importing data or
+    changing slugs bypassing the field::
+
+        $ ./manage.py autoslug_rebuild_counters blog.Article slug
+    """
+    help = 'Rebuilds slug counters for given AutoSlugField.'
+
+    def handle(self, *args, **options):
+        model, field = self.get_model_field(args, options)
+        if getattr(field, 'strategy', None) != 'counter':
+            raise CommandError('%s.%s does not use the "counter" strategy'
+                               % (model._meta.object_name, field.name))
+        count = utils.rebuild_slug_counters(field, model)
+        self.stdout.write('Rebuilt %d counter(s) for %s.%s\n'
+                          % (count, model._meta.object_name, field.name))
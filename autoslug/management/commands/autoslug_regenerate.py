@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright (c) 2008—2012 Andy Mikhailenko
+#
+#  This file is part of django-autoslug.
+#
+#  django-autoslug is free software under terms of the GNU Lesser
+#  General Public License version 3 (LGPLv3) as published by the Free
+#  Software Foundation. See the file README for copying conditions.
+#
+
+from __future__ import with_statement
+
+# python
+import csv
+from itertools import islice
+import sys
+
+# django
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.http import int_to_base36
+
+# this package
+from autoslug import utils
+from autoslug.management.base import FieldCommand, make_option_list, save_slugs
+
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# scopes are regenerated in memory; refuse larger ones unless told otherwise
+DEFAULT_MAX_SCOPE_SIZE = 100000
+
+# prefix of temporary slugs; real slugs never start with a separator
+TEMPORARY_PREFIX = u'-tmp-'
+
+OPTIONS = (
+    ('--dry-run', dict(action='store_true', dest='dry_run', default=False,
+                       help='only show the slugs that would change')),
+    ('--mapping', dict(dest='mapping', default=None,
+                       help='write "pk,old slug,new slug" of changed rows to '
+                            'given CSV file, e.g. to set up redirects')),
+    ('--chunk-size', dict(type=int, dest='chunk_size', default=DEFAULT_CHUNK_SIZE,
+                          help='number of rows fetched or updated at once')),
+    ('--max-scope-size', dict(type=int, dest='max_scope_size',
+                              default=DEFAULT_MAX_SCOPE_SIZE,
+                              help='maximum number of rows of a uniqueness '
+                                   'scope, which is kept in memory')),
+)
+
+
+class Command(FieldCommand):
+    """
+    Regenerates slugs of existing rows, e.g. after changing the slugify
+    function or the `sep` or `max_length` of the field, without saving the
+    objects (i.e. no save signals are sent)::
+
+        $ ./manage.py autoslug_regenerate blog.Article slug --dry-run
+        $ ./manage.py autoslug_regenerate blog.Article slug --mapping=redirects.csv
+
+    Slugs are computed from `populate_from` or, if it is not set, from the
+    current slug. Rows are read ordered by the columns of the `unique_with`
+    fields (see :func:`get_scope_ordering`) so that each uniqueness scope is
+    regenerated as one batch in memory: indices are assigned from scratch in
+    the order of primary keys. Only changed rows are written, first with
+    temporary slugs and then with the new ones so that the unique constraint
+    is not violated halfway; each scope is updated in a single transaction
+    (see :func:`autoslug.utils.atomic`).
+
+    A scope with more than ``--max-scope-size`` rows (100000 by default) is
+    refused; the scopes before it have been updated by then. Note that
+    fields with only ``unique=True`` have a single scope which spans the
+    whole table, so nothing is changed if the table is larger than that.
+    """
+    help = 'Regenerates slugs of existing rows.'
+    options = OPTIONS
+
+    if hasattr(BaseCommand, 'option_list'):    # Django < 1.10
+        option_list = BaseCommand.option_list + make_option_list(OPTIONS)
+
+    def handle(self, *args, **options):
+        model, field = self.get_model_field(args, options)
+
+        dry_run = options.get('dry_run')
+        chunk_size = options.get('chunk_size') or DEFAULT_CHUNK_SIZE
+        max_scope_size = options.get('max_scope_size') or DEFAULT_MAX_SCOPE_SIZE
+        mapping = None
+        if options.get('mapping'):
+            mapping = open(options['mapping'], 'w')
+            writer = csv.writer(mapping)
+            writer.writerow(['pk', 'old', 'new'])
+
+        total = changed = 0
+        try:
+            for scope in iter_scopes(field, model, chunk_size, max_scope_size):
+                updates = regenerate_scope(field, scope)
+                total += len(scope)
+                changed += len(updates)
+                for pk, old, new in updates:
+                    if dry_run:
+                        self.stdout.write(u'%s: %s -> %s\n' % (pk, old, new))
+                    if mapping:
+                        writer.writerow([to_csv(x) for x in (pk, old, new)])
+                if not dry_run:
+                    save_scope(field, model, updates, chunk_size)
+        finally:
+            if mapping:
+                mapping.close()
+
+        self.stdout.write('%s %d of %d slug(s) of %s.%s\n'
+                          % ('Would change' if dry_run else 'Changed',
+                             changed, total, model._meta.object_name, field.name))
+
+
+def iter_scopes(field, model, chunk_size, max_scope_size=DEFAULT_MAX_SCOPE_SIZE):
+    """
+    Yields lists of ``(pk, old slug, candidate slugs)`` for rows that share
+    the same `unique_with` values (or for all rows if there are none).
+    Raises `CommandError` if a scope has more than `max_scope_size` rows.
+    """
+    manager = field.manager or model._default_manager
+    ordering = get_scope_ordering(field, model)
+    rows = manager.order_by(*(ordering + ['pk'])).iterator()
+
+    scope_key, scope = None, []
+    done = set()
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        if field.unique_with:
+            utils.prime_related_objects(field, chunk)
+        for instance in chunk:
+            key = None
+            if field.unique_with:
+                lookups = utils.get_uniqueness_lookups(field, instance, field.unique_with)
+                key = utils.get_scope_key(lookups)
+            if scope and key != scope_key:
+                done.add(scope_key)
+                yield scope
+                scope = []
+            if key in done:
+                # regenerating the rest of the scope separately would
+                # duplicate the slugs of its first part
+                raise CommandError('Rows of a uniqueness scope of %s.%s are not'
+                                   ' adjacent when ordered by %s'
+                                   % (model._meta.object_name, field.name,
+                                      ', '.join(ordering)))
+            if max_scope_size <= len(scope):
+                raise CommandError('A uniqueness scope of %s.%s has more than'
+                                   ' %d rows, see --max-scope-size'
+                                   % (model._meta.object_name, field.name,
+                                      max_scope_size))
+            scope_key = key
+            scope.append((instance.pk, getattr(instance, field.attname),
+                          get_candidate_slugs(field, instance)))
+    if scope:
+        yield scope
+
+
+def get_scope_ordering(field, model):
+    """
+    Returns the ordering which puts the rows of each uniqueness scope next
+    to each other: foreign keys are ordered by their columns rather than by
+    the `Meta.ordering` of the related model, and the date field (whose
+    scopes are ranges) comes last. Raises `CommandError` if `unique_with`
+    has several dates, because no ordering keeps both ranges together.
+    """
+    plan = utils.get_uniqueness_plan(field, model, field.unique_with)
+    ordering, dates = [], []
+    _collect_ordering(plan, '', ordering, dates)
+    if 1 < len(dates):
+        raise CommandError('Cannot regenerate %s.%s scope by scope: unique_with'
+                           ' has more than one date (%s)'
+                           % (model._meta.object_name, field.name, ', '.join(dates)))
+    return ordering + dates
+
+
+def _collect_ordering(plan, prefix, ordering, dates):
+    for step in plan.steps:
+        if step.date_parts:
+            dates.append(prefix + step.name)
+        elif step.inner_plan:
+            _collect_ordering(step.inner_plan, '%s%s__' % (prefix, step.name),
+                              ordering, dates)
+        elif step.is_foreign_key:
+            # e.g. "author__id" (the join is trimmed) rather than "author_id"
+            # which older versions of Django cannot order by
+            ordering.append('%s%s__%s' % (prefix, step.name, step.target_name))
+        else:
+            ordering.append(prefix + step.name)
+
+
+def get_candidate_slugs(field, instance):
+    if field.populate_from:
+        # compute the slug from its source, not from its current value
+        setattr(instance, field.attname, u'')
+    return field.get_candidate_slugs(instance)
+
+
+def regenerate_scope(field, scope):
+    """
+    Assigns slugs to the rows of a scope as if they were saved one by one in
+    given order into an empty table. Returns ``(pk, old, new)`` for rows
+    whose slugs have changed.
+    """
+    registry = utils.SlugRegistry(field, field.model._default_manager.none())
+    unique = field.unique or field.unique_with
+    updates = []
+    for pk, old, slugs in scope:
+        if not slugs:
+            # the field is set to an empty value (see get_candidate_values)
+            new = None if field.null else u''
+        elif unique:
+            new = registry.allocate(pk, slugs)
+        else:
+            new = slugs[0]
+        if new != old:
+            updates.append((pk, old, new))
+    return updates
+
+
+def save_scope(field, model, updates, chunk_size):
+    manager = field.manager or model._default_manager
+    slugs = get_temporary_slugs(field, model, len(updates))
+    temporary = [(pk, slug) for (pk, old, new), slug in zip(updates, slugs)]
+    final = [(pk, new) for pk, old, new in updates]
+    with utils.atomic(manager.db):
+        for items in temporary, final:
+            for i in range(0, len(items), chunk_size):
+                instances = []
+                for pk, slug in items[i:i + chunk_size]:
+                    instance = model(pk=pk)
+                    setattr(instance, field.attname, slug)
+                    instances.append(instance)
+                save_slugs(field, manager, instances)
+
+
+def get_temporary_slugs(field, model, count):
+    """
+    Returns `count` distinct temporary slugs that fit in the column: numbers
+    in base 36 after as much of :data:`TEMPORARY_PREFIX` as fits (at least
+    its leading separator). Primary keys would not always fit.
+    """
+    width = len(int_to_base36(max(count - 1, 0)))
+    length = len(TEMPORARY_PREFIX)
+    if field.max_length:
+        length = min(length, field.max_length - width)
+    if length < 1:
+        raise CommandError('%s.%s is too short for temporary slugs of %d rows'
+                           % (model.__name__, field.name, count))
+    return [TEMPORARY_PREFIX[:length] + int_to_base36(i) for i in range(count)]
+
+
+def to_csv(value):
+    value = u'' if value is None else utils.force_text(value)
+    if sys.version < '3':
+        # the csv module does not support unicode in Python 2
+        value = value.encode('utf-8')
+    return value
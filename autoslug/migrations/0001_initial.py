@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlugCounter',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=100)),
+                ('field', models.CharField(max_length=100)),
+                ('scope', models.CharField(max_length=40)),
+                ('slug', models.CharField(max_length=255)),
+                ('index', models.PositiveIntegerField(default=1)),
+            ],
+            options={
+                'unique_together': {('model', 'field', 'scope', 'slug')},
+            },
+        ),
+    ]
@@ -0,0 +1,3 @@
+# Django < 1.7 has no migrations; failing to import this package makes South
+# treat the app as unmigrated, so that syncdb creates its table
+from django.db import migrations
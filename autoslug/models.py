@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright (c) 2008—2012 Andy Mikhailenko
+#
+#  This file is part of django-autoslug.
+#
+#  django-autoslug is free software under terms of the GNU Lesser
+#  General Public License version 3 (LGPLv3) as published by the Free
+#  Software Foundation. See the file README for copying conditions.
+#
+
+# django
+from django.db.models import AutoField, CharField, Model, PositiveIntegerField
+
+
+__all__ = ['SlugCounter']
+
+
+class SlugCounter(Model):
+    """
+    The highest index allocated for a slug within a uniqueness scope. Used by
+    ``AutoSlugField(strategy='counter')`` to get the next index for a slug
+    with a single ``UPDATE`` instead of looking for a free one.
+
+    Counters can be rebuilt from existing slugs with the management command
+    ``autoslug_rebuild_counters``.
+    """
+    # explicit so that DEFAULT_AUTO_FIELD does not change the migrated table
+    id = AutoField(primary_key=True)
+    model = CharField(max_length=100)    # e.g. "blog.Article"
+    field = CharField(max_length=100)
+    scope = CharField(max_length=40)     # see autoslug.utils.get_scope_key()
+    slug = CharField(max_length=255)     # the base slug, e.g. "foo"
+    index = PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('model', 'field', 'scope', 'slug')
+
@@ -25,14 +25,22 @@ Django settings that affect django-autoslug:
       # custom function, defined inline:
       AUTOSLUG_SLUGIFY_FUNCTION = lambda slug: 'can i haz %s?' % slug
 
-  If no value is given, default value is used.
+  If no value is given, default value is used. The function is looked up
+  on first use, not when django-autoslug is imported.
 
-  Default value is one of these depending on availability in given order:
+  Default value is one of these depending on availability in given order
+  (the libraries are imported on first use as well):
 
   * `unidecode.unidecode()` if Unidecode_ is available;
   * `pytils.translit.slugify()` if pytils_ is available;
   * `django.template.defaultfilters.slugify()` bundled with Django.
 
+  django-autoslug also ships a faster equivalent of the default function
+  which transliterates the string using a translation table (the output is
+  the same)::
+
+     AUTOSLUG_SLUGIFY_FUNCTION = 'autoslug.utils.fast_slugify'
+
   django-autoslug also ships a couple of slugify functions that use
   the translitcodec_ Python library, e.g.::
 
@@ -45,15 +53,116 @@ Django settings that affect django-autoslug:
      # only performing single character replacements
      AUTOSLUG_SLUGIFY_FUNCTION = 'autoslug.utils.translit_one'
 
+`AUTOSLUG_SLUGIFY_CACHE`
+  If set, the slugify function is wrapped with a cache of given size, so
+  that values which are saved over and over again (e.g. names of categories)
+  are only slugified once, e.g.::
+
+      # remember up to 10000 most recently used values
+      AUTOSLUG_SLUGIFY_CACHE = 10000
+
+  ``True`` means the default size (1024 values). See also the `slugify_cache`
+  argument of :class:`~autoslug.fields.AutoSlugField`.
+
+`AUTOSLUG_BACKEND`
+  The backend that picks unique slugs for fields without an explicit
+  `strategy` or `backend` (see :mod:`autoslug.backends`), as a class, an
+  instance or a dotted path, e.g.::
+
+      # fetch all rival slugs at once
+      AUTOSLUG_BACKEND = 'autoslug.backends.PrefixBackend'
+
+      # do not query the database at all (e.g. in tests)
+      AUTOSLUG_BACKEND = 'autoslug.backends.MemoryBackend'
+
+`AUTOSLUG_FORCE_BACKEND`
+  The backend used by all fields regardless of their `strategy` or
+  `backend`, e.g. to pick slugs without querying the database in tests::
+
+      AUTOSLUG_FORCE_BACKEND = 'autoslug.backends.MemoryBackend'
+
+  See also :func:`autoslug.backends.override_backend`.
+
+`AUTOSLUG_RESERVATION_CACHE`
+  If set to the alias of a cache (see Django's ``CACHES`` setting), every
+  unique slug is reserved in that cache with an atomic ``add()`` before it
+  is used, so that concurrent processes saving objects with the same slug
+  pick different indices instead of failing on the unique constraint. The
+  cache must be shared by the processes: the local-memory cache only works
+  for threads of one process, the file-based cache for one host, memcached
+  or Redis for several hosts. See
+  :func:`autoslug.utils.reserve_in_cache`, e.g.::
+
+      AUTOSLUG_RESERVATION_CACHE = 'default'
+
+`AUTOSLUG_RESERVATION_TIMEOUT`
+  How many seconds a slug stays reserved (see `AUTOSLUG_RESERVATION_CACHE`);
+  it should exceed the time it takes to save an object. Default is 10.
+
 .. _Unidecode: http://pypi.python.org/pypi/Unidecode
 .. _pytils: http://pypi.python.org/pypi/pytils
 .. _translitcodec: http://pypi.python.org/pypi/translitcodec
 
 """
 from django.conf import settings
-from django.core.urlresolvers import get_callable
+try:
+    from django.urls import get_callable
+except ImportError:    # Django < 1.10
+    from django.core.urlresolvers import get_callable
+try:
+    from django.test.signals import setting_changed
+except ImportError:    # Django < 1.4
+    setting_changed = None
+
+
+DEFAULT_SLUGIFY_FUNCTION = 'autoslug.utils.slugify'
+
+# the resolved (and possibly cached) slugify function; the settings are read
+# on first use rather than on import, see get_slugify_function()
+_slugify_function = None
+
+
+def get_slugify_function():
+    """
+    Returns the slugify function defined by the settings. The function is
+    resolved on first call and then reused.
+    """
+    global _slugify_function
+    if _slugify_function is None:
+        # use custom slugifying function if any
+        function = getattr(settings, 'AUTOSLUG_SLUGIFY_FUNCTION', None)
+        function = get_callable(function or DEFAULT_SLUGIFY_FUNCTION)
+
+        # cache slugified values if told so
+        cache_size = getattr(settings, 'AUTOSLUG_SLUGIFY_CACHE', None)
+        if cache_size:
+            from autoslug.utils import SlugifyCache, SLUGIFY_CACHE_SIZE
+            if cache_size is True:
+                cache_size = SLUGIFY_CACHE_SIZE
+            function = SlugifyCache(function, cache_size)
+
+        _slugify_function = function
+    return _slugify_function
+
+
+def slugify(value):
+    """
+    Slugifies given value with the function defined by the settings. This is
+    the default `slugify` of :class:`~autoslug.fields.AutoSlugField`.
+    """
+    return get_slugify_function()(value)
+
+
+def reset(**kwargs):
+    """
+    Forgets the resolved slugify function so that it is looked up again on
+    next use. Called when the settings are changed in tests.
+    """
+    global _slugify_function
+    if kwargs.get('setting') in (None, 'AUTOSLUG_SLUGIFY_FUNCTION',
+                                 'AUTOSLUG_SLUGIFY_CACHE'):
+        _slugify_function = None
+
 
-# use custom slugifying function if any
-#slugify_function_path = getattr(settings, 'AUTOSLUG_SLUGIFY_FUNCTION', 'autoslug.utils.slugify')
-slugify_function_path = 'autoslug.utils.slugify'
-slugify = get_callable(slugify_function_path)
+if setting_changed is not None:
+    setting_changed.connect(reset)
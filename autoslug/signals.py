@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright (c) 2008—2012 Andy Mikhailenko
+#
+#  This file is part of django-autoslug.
+#
+#  django-autoslug is free software under terms of the GNU Lesser
+#  General Public License version 3 (LGPLv3) as published by the Free
+#  Software Foundation. See the file README for copying conditions.
+#
+"""
+Signals sent by django-autoslug:
+
+`slug_generated`
+  Sent by `AutoSlugField.pre_save` after a slug has been generated, with the
+  model class as the sender and the following arguments:
+
+  * `instance`: the model instance being saved;
+  * `field`: the AutoSlugField;
+  * `slug`: the resulting slug;
+  * `duration`: total time spent in `pre_save`, in seconds;
+  * `slugify_time`: time spent slugifying the candidate values, in seconds;
+  * `queries`: number of queries issued to find a unique slug;
+  * `iterations`: number of indexed slugs tried ("foo-2", "foo-3", ...);
+  * `index`: the index of the resulting slug (1 if there is none).
+
+  The costs are only measured if the signal has receivers, e.g.::
+
+      from autoslug.signals import slug_generated
+
+      def report(sender, field, index, duration, **kwargs):
+          statsd.timing('autoslug.%s' % sender.__name__, duration)
+          if 100 < index:
+              logger.warning('%s.%s: slug index %d', sender.__name__,
+                             field.name, index)
+
+      slug_generated.connect(report)
+
+  Note that with the ``optimistic`` strategy the signal is sent for every
+  attempt to save the instance.
+"""
+
+# django
+from django.dispatch import Signal
+
+
+__all__ = ['slug_generated']
+
+
+slug_generated = Signal()
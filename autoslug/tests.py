@@ -13,10 +13,12 @@
 import datetime
 
 # django
-from django.db.models import Model, CharField, DateField, ForeignKey, Manager
+from django.db.models import (Model, CharField, DateField, DateTimeField, ForeignKey,
+                              IntegerField, Manager)
 
 # this app
 from autoslug.settings import slugify as default_slugify
+from autoslug.utils import fast_slugify
 from autoslug import AutoSlugField
 
 
@@ -72,6 +74,30 @@ class ModelWithUniqueSlugFK(Model):
     >>> c.save()
     >>> c.slug
     u'hello-world-4'
+    >>> from autoslug.utils import get_uniqueness_plan
+    >>> field = ModelWithUniqueSlugFK._meta.get_field('slug')
+    >>> plan = get_uniqueness_plan(field, ModelWithUniqueSlugFK, field.unique_with)
+    >>> plan is get_uniqueness_plan(field, ModelWithUniqueSlugFK, field.unique_with)
+    True
+    >>> list(plan.get_lookups(d)) == [('simple_model__name', 'test')]
+    True
+    >>> # the related object is not fetched if it is not cached yet
+    >>> d = ModelWithUniqueSlugFK.objects.get(pk=d.pk)
+    >>> [name for name, value in plan.get_lookups(d)]
+    ['simple_model__name__in']
+    >>> d.save()
+    >>> d.slug
+    u'hello-world-3'
+    >>> batch = [ModelWithUniqueSlugFK(name=greeting, simple_model_id=sm.pk)
+    ...          for sm in (sm1, sm2, sm3)]
+    >>> [x.slug for x in field.populate_batch(batch)]
+    [u'hello-world-5', u'hello-world-6', u'hello-world-7']
+    >>> batch = [ModelWithUniqueSlugFK(name=greeting, simple_model_id=sm.pk)
+    ...          for sm in (sm1, sm2)]
+    >>> x = field.populate_batch(batch, related_objects={
+    ...     'simple_model': SimpleModel.objects.in_bulk([sm1.pk, sm2.pk])})
+    >>> [x.slug for x in batch]
+    [u'hello-world-5', u'hello-world-6']
     """
     name = CharField(max_length=200)
     simple_model = ForeignKey(SimpleModel)
@@ -150,6 +176,74 @@ class ModelWithUniqueSlugYear(Model):
     slug = AutoSlugField(unique_with='date__year')
 
 
+class UTCPlus2(datetime.tzinfo):
+    def utcoffset(self, dt):
+        return datetime.timedelta(hours=2)
+
+    def dst(self, dt):
+        return datetime.timedelta(0)
+
+    def tzname(self, dt):
+        return 'UTC+2'
+
+
+class ModelWithUniqueSlugDateTime(Model):
+    """
+    >>> a = ModelWithUniqueSlugDateTime(slug='test', date=datetime.datetime(2009, 9,  9, 10, 0))
+    >>> b = ModelWithUniqueSlugDateTime(slug='test', date=datetime.datetime(2009, 9,  9, 23, 30))
+    >>> c = ModelWithUniqueSlugDateTime(slug='test', date=datetime.datetime(2009, 9, 10, 0, 30))
+    >>> for m in a,b,c:
+    ...     m.save()
+    >>> a.slug, b.slug, c.slug
+    (u'test', u'test-2', u'test')
+    >>> # the day is looked up as a range (the column index can be used)
+    >>> from django.test.utils import override_settings
+    >>> from django.utils import timezone
+    >>> from autoslug.utils import get_uniqueness_lookups
+    >>> field = ModelWithUniqueSlugDateTime._meta.get_field('slug')
+    >>> def get_lookups(date):
+    ...     instance = ModelWithUniqueSlugDateTime(slug='test', date=date)
+    ...     lookups = get_uniqueness_lookups(field, instance, field.unique_with)
+    ...     return [(str(name), str(value)) for name, value in lookups]
+    >>> get_lookups(b.date)
+    [('date__gte', '2009-09-09 00:00:00'), ('date__lt', '2009-09-10 00:00:00')]
+    >>> # days begin in the current time zone
+    >>> with override_settings(USE_TZ=True):
+    ...     with timezone.override(UTCPlus2()):
+    ...         get_lookups(datetime.datetime(2009, 9, 9, 23, 30, tzinfo=timezone.utc))
+    [('date__gte', '2009-09-10 00:00:00+02:00'), ('date__lt', '2009-09-11 00:00:00+02:00')]
+    """
+    date = DateTimeField()
+    slug = AutoSlugField(unique_with='date__day')
+
+
+class ModelWithUniqueTogetherSlug(Model):
+    """
+    >>> ModelWithUniqueTogetherSlug._meta.unique_together
+    (('date', 'slug'),)
+    >>> date = datetime.date(2009, 9, 9)
+    >>> a = ModelWithUniqueTogetherSlug.objects.create(slug='test', date=date)
+    >>> b = ModelWithUniqueTogetherSlug.objects.create(slug='test', date=date)
+    >>> b.slug
+    u'test-2'
+    >>> # the database enforces it, too
+    >>> ModelWithUniqueTogetherSlug.objects.filter(pk=b.pk).update(slug='test') # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+    ...
+    IntegrityError: columns date, slug are not unique
+    >>> from autoslug.utils import get_scope_index_fields
+    >>> field = ModelWithUniqueSlugDateTime._meta.get_field('slug')
+    >>> get_scope_index_fields(field, ModelWithUniqueSlugDateTime)
+    ['slug', 'date']
+    >>> get_scope_index_fields(field, ModelWithUniqueSlugDateTime, unique=True)
+    Traceback (most recent call last):
+    ...
+    ValueError: AutoSlugField ModelWithUniqueSlugDateTime.slug cannot be unique together with its `unique_with` because "date__day" is a date range.
+    """
+    date = DateField()
+    slug = AutoSlugField(unique_with='date', unique_with_index='unique')
+
+
 class ModelWithLongName(Model):
     """
     >>> long_name = 'x' * 200
@@ -180,6 +274,446 @@ class ModelWithLongNameUnique(Model):
     slug = AutoSlugField(populate_from='name', unique=True)
 
 
+class ModelWithPrefixStrategy(Model):
+    """
+    >>> [ModelWithPrefixStrategy.objects.create(name='Hello world').slug
+    ...  for x in range(0,3)]
+    [u'hello-world', u'hello-world-2', u'hello-world-3']
+    >>> # slugs that merely look similar do not occupy indices
+    >>> for slug in ['hello-world-04', 'hello-world-5-x', 'hello-world-']:
+    ...     x = ModelWithPrefixStrategy.objects.create(slug=slug)
+    >>> ModelWithPrefixStrategy.objects.filter(slug='hello-world-2').delete()
+    >>> [ModelWithPrefixStrategy.objects.create(name='Hello world').slug
+    ...  for x in range(0,3)]
+    [u'hello-world-2', u'hello-world-4', u'hello-world-5']
+    >>> long_name = 'x' * 200
+    >>> slugs = [ModelWithPrefixStrategy.objects.create(name=long_name).slug
+    ...          for x in range(0,11)]
+    >>> slugs[1][-3:], slugs[8][-3:], slugs[9][-4:]
+    (u'x-2', u'x-9', u'x-10')
+    >>> [len(slug) for slug in slugs] == [50] * 11
+    True
+    >>> len(set(slugs))
+    11
+    """
+    name = CharField(max_length=200)
+    slug = AutoSlugField(populate_from='name', unique=True, strategy='prefix')
+
+
+class ModelWithOptimisticStrategy(Model):
+    """
+    >>> from django.db import connection
+    >>> model = ModelWithOptimisticStrategy
+    >>> [model.objects.create(name='Hello world').slug for x in range(0,3)]
+    [u'hello-world', u'hello-world-2', u'hello-world-3']
+    >>> connection.use_debug_cursor = True
+    >>> len(connection.queries)
+    0
+    >>> a = model.objects.create(name='Unique title')
+    >>> [str(query['sql'].split()[0]) for query in connection.queries]
+    ['INSERT']
+    >>> connection.use_debug_cursor = None
+    >>> a.name = 'Hello world'
+    >>> a.save()
+    >>> a.slug
+    u'unique-title'
+    >>> b = model(name='Hello world')
+    >>> b.save()
+    >>> b.slug
+    u'hello-world-4'
+    >>> # retries do not break an enclosing transaction
+    >>> from autoslug.utils import atomic
+    >>> with atomic():
+    ...     c = model.objects.create(name='Hello world')
+    ...     d = model.objects.create(name='Hello world')
+    >>> c.slug, d.slug
+    (u'hello-world-5', u'hello-world-6')
+    >>> # other constraint violations are not retried
+    >>> model(name='x', pk=a.pk).save(force_insert=True) # doctest: +ELLIPSIS, +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+    ...
+    IntegrityError: PRIMARY KEY must be unique
+    >>> AutoSlugField(strategy='optimistic', unique_with='date')
+    Traceback (most recent call last):
+    ...
+    ValueError: AutoSlugField strategy "optimistic" relies on the unique \
+    constraint and cannot be used with unique=False or unique_with.
+    """
+    name = CharField(max_length=200)
+    slug = AutoSlugField(populate_from='name', unique=True, strategy='optimistic')
+
+
+class ModelWithCounterStrategy(Model):
+    """
+    >>> from autoslug.models import SlugCounter
+    >>> model = ModelWithCounterStrategy
+    >>> d = datetime.date(2012, 1, 1)
+    >>> [model.objects.create(name='Hello', date=d).slug for x in range(0,3)]
+    [u'hello', u'hello-2', u'hello-3']
+    >>> SlugCounter.objects.get().index
+    3
+    >>> model.objects.create(name='Hello', date=datetime.date(2012, 1, 2)).slug
+    u'hello'
+    >>> # freed indices are not reused
+    >>> model.objects.get(slug='hello-3').delete()
+    >>> model.objects.create(name='Hello', date=d).slug
+    u'hello-4'
+    >>> # slugs taken bypassing the counter are skipped
+    >>> e = model.objects.create(name='Hello-5', date=d)
+    >>> e.slug
+    u'hello-5'
+    >>> model.objects.create(name='Hello', date=d).slug
+    u'hello-6'
+    >>> # the counter is created from existing slugs if there is none
+    >>> SlugCounter.objects.all().delete()
+    >>> model.objects.create(name='Hello', date=d).slug
+    u'hello-7'
+    >>> SlugCounter.objects.all().delete()
+    >>> from django.core.management import call_command
+    >>> call_command('autoslug_rebuild_counters', 'autoslug.ModelWithCounterStrategy', 'slug')
+    Rebuilt 1 counter(s) for ModelWithCounterStrategy.slug
+    >>> SlugCounter.objects.get().index
+    7
+    >>> from autoslug.utils import get_model_field
+    >>> get_model_field('autoslug.ModelWithoutCounter', 'slug')
+    Traceback (most recent call last):
+    ...
+    ValueError: Unknown model "autoslug.ModelWithoutCounter"
+    """
+    name = CharField(max_length=200)
+    date = DateField()
+    slug = AutoSlugField(populate_from='name', unique_with='date', strategy='counter')
+
+
+class ModelWithGallopStrategy(Model):
+    """
+    >>> from autoslug.signals import slug_generated
+    >>> model = ModelWithGallopStrategy
+    >>> slugs = [model.objects.create(name='Hello world').slug for x in range(0,12)]
+    >>> slugs[:3], slugs[-1]
+    ([u'hello-world', u'hello-world-2', u'hello-world-3'], u'hello-world-12')
+    >>> reports = []
+    >>> def report(sender, slug, queries, index, **kwargs):
+    ...     reports.append((str(slug), queries, index))
+    >>> slug_generated.connect(report, sender=model)
+    >>> x = model.objects.create(name='Hello world')
+    >>> slug_generated.disconnect(report, sender=model)
+    >>> reports    # 2, 3, 5, 9, 17, ... then 10 to 16
+    [('hello-world-13', 3, 13)]
+    >>> # indices of deleted objects may be skipped
+    >>> model.objects.filter(slug='hello-world-4').delete()
+    >>> model.objects.create(name='Hello world').slug
+    u'hello-world-14'
+    >>> long_name = 'x' * 200
+    >>> slugs = [model.objects.create(name=long_name).slug for x in range(0,11)]
+    >>> slugs[1][-3:], slugs[8][-3:], slugs[9][-4:]
+    (u'x-2', u'x-9', u'x-10')
+    >>> [len(slug) for slug in slugs] == [50] * 11
+    True
+    >>> len(set(slugs))
+    11
+    """
+    name = CharField(max_length=200)
+    slug = AutoSlugField(populate_from='name', unique=True, strategy='gallop',
+                         unique_warning=False)
+
+
+def can_lock_slugs():
+    """
+    Returns ``True`` if no process-local slug lock is held by another thread.
+    """
+    import threading
+    from autoslug.utils import _lock_stripes
+    results = []
+    def try_locks():
+        for lock in _lock_stripes:
+            if not lock.acquire(False):
+                return results.append(False)
+            lock.release()
+        results.append(True)
+    thread = threading.Thread(target=try_locks)
+    thread.start()
+    thread.join()
+    return results[0]
+
+
+class ModelWithLockStrategy(Model):
+    """
+    >>> from django.db.models.signals import post_save
+    >>> model = ModelWithLockStrategy
+    >>> date = datetime.date(2012, 10, 16)
+    >>> [model.objects.create(name='Hello', date=date).slug for x in range(0,3)]
+    [u'hello', u'hello-2', u'hello-3']
+    >>> # the slug is locked until the object is saved
+    >>> locked = []
+    >>> def check_lock(sender, **kwargs):
+    ...     locked.append(not can_lock_slugs())
+    >>> post_save.connect(check_lock, sender=model)
+    >>> model.objects.create(name='Hello', date=date).slug
+    u'hello-4'
+    >>> post_save.disconnect(check_lock, sender=model)
+    >>> locked, can_lock_slugs()
+    ([True], True)
+    >>> # so is the slug of a field which gets the backend otherwise
+    >>> from django.test.utils import override_settings
+    >>> from autoslug.backends import override_backend
+    >>> model = ModelWithUniqueSlug
+    >>> locked = []
+    >>> post_save.connect(check_lock, sender=model)
+    >>> with override_settings(AUTOSLUG_BACKEND='autoslug.backends.LockBackend'):
+    ...     model.objects.create(name='Locked').slug
+    u'locked'
+    >>> with override_backend('autoslug.backends.LockBackend'):
+    ...     model.objects.create(name='Locked').slug
+    u'locked-2'
+    >>> model.objects.create(name='Locked').slug
+    u'locked-3'
+    >>> post_save.disconnect(check_lock, sender=model)
+    >>> locked, can_lock_slugs()
+    ([True, True, False], True)
+    >>> model.objects.filter(name='Locked').delete()
+    """
+    name = CharField(max_length=200)
+    date = DateField()
+    slug = AutoSlugField(populate_from='name', unique_with='date', strategy='lock',
+                         unique_warning=False)
+
+
+class ModelWithSlugReservations(Model):
+    """
+    >>> import autoslug
+    >>> from autoslug.signals import slug_generated
+    >>> model = ModelWithSlugReservations
+    >>> x = model.objects.create(name='Hello')
+    >>> reports = []
+    >>> def report(sender, slug, queries, index, **kwargs):
+    ...     reports.append((str(slug), queries, index))
+    >>> slug_generated.connect(report, sender=model)
+    >>> with autoslug.reservations():
+    ...     for x in range(0,4):
+    ...         x = model.objects.create(name='Hello')
+    ...     a = model.objects.get(slug='hello-3')
+    ...     a.save()
+    ...     a.slug
+    ...     b = model.objects.create(name='Hello')
+    u'hello-3'
+    >>> reports    # doctest: +NORMALIZE_WHITESPACE
+    [('hello-2', 1, 2), ('hello-3', 0, 3), ('hello-4', 0, 4), ('hello-5', 0, 5),
+     ('hello-3', 0, 1), ('hello-6', 0, 6)]
+    >>> # the database is queried again outside of the block
+    >>> model.objects.create(name='Hello').slug
+    u'hello-7'
+    >>> reports[-1]
+    ('hello-7', 7, 7)
+    >>> slug_generated.disconnect(report, sender=model)
+    >>> try:
+    ...     with autoslug.reservations():
+    ...         x = model.objects.create(name='Hello')
+    ...         raise ValueError
+    ... except ValueError:
+    ...     pass
+    >>> from autoslug.utils import _reservations
+    >>> _reservations.registries is None
+    True
+    """
+    name = CharField(max_length=200)
+    slug = AutoSlugField(populate_from='name', unique=True, unique_warning=False)
+
+
+class ModelWithMemoryBackend(Model):
+    """
+    >>> from django.db import connection, reset_queries
+    >>> from django.test.utils import override_settings
+    >>> model = ModelWithMemoryBackend
+    >>> backend = model._meta.get_field('slug').get_backend()
+    >>> backend    # doctest: +ELLIPSIS
+    <autoslug.backends.MemoryBackend object at ...>
+    >>> connection.use_debug_cursor = True
+    >>> [model.objects.create(name='Hello').slug for x in range(0,3)]
+    [u'hello', u'hello-2', u'hello-3']
+    >>> [str(query['sql'].split()[0]) for query in connection.queries]
+    ['INSERT', 'INSERT', 'INSERT']
+    >>> # deleted objects free their slugs
+    >>> model.objects.filter(slug='hello-2').delete()
+    >>> model.objects.create(name='Hello').slug
+    u'hello-2'
+    >>> connection.use_debug_cursor = None
+    >>> reset_queries()
+    >>> backend.reset()
+    >>> backend.registries
+    {}
+    >>> # the backend of fields without a strategy can be set globally
+    >>> field = ModelWithUniqueSlug._meta.get_field('slug')
+    >>> type(field.get_backend()).__name__
+    'LinearBackend'
+    >>> with override_settings(AUTOSLUG_BACKEND='autoslug.backends.PrefixBackend'):
+    ...     type(field.get_backend()).__name__
+    ...     type(ModelWithCounterStrategy._meta.get_field('slug').get_backend()).__name__
+    'PrefixBackend'
+    'CounterBackend'
+    >>> # all fields can be switched to a fresh memory backend, which can be
+    >>> # seeded from the existing rows
+    >>> from autoslug.backends import override_backend
+    >>> dated = ModelWithUniqueSlugDate
+    >>> date = datetime.date(2009, 9, 9)
+    >>> dated.objects.all().delete()
+    >>> for x in range(0,2):
+    ...     x = dated.objects.create(slug='test', date=date)
+    >>> with override_backend() as memory:
+    ...     memory.seed(dated)
+    ...     [dated.objects.create(slug='test', date=date).slug,
+    ...      dated.objects.create(slug='test', date=date - datetime.timedelta(1)).slug]
+    ...     [type(f.get_backend()).__name__ for f in (field, ModelWithCounterStrategy._meta.get_field('slug'))]
+    2
+    [u'test-3', u'test']
+    ['MemoryBackend', 'MemoryBackend']
+    >>> type(field.get_backend()).__name__
+    'LinearBackend'
+    >>> dated.objects.all().delete()
+    >>> # scopes that span a foreign key are told apart by the key, so that
+    >>> # the related object need not be fetched
+    >>> sm = SimpleModel.objects.create(name='memory')
+    >>> reset_queries()
+    >>> connection.use_debug_cursor = True
+    >>> with override_backend():
+    ...     [ModelWithUniqueSlugFK.objects.create(name='Hi', simple_model_id=sm.pk).slug
+    ...      for x in range(0,2)]
+    [u'hi', u'hi-2']
+    >>> [str(query['sql'].split()[0]) for query in connection.queries]
+    ['INSERT', 'INSERT']
+    >>> connection.use_debug_cursor = None
+    >>> reset_queries()
+    >>> sm.delete()
+    """
+    name = CharField(max_length=200)
+    slug = AutoSlugField(populate_from='name', unique=True,
+                         backend='autoslug.backends.MemoryBackend')
+
+
+class ModelWithCacheReservation(Model):
+    """
+    >>> from django.core.cache import cache
+    >>> from django.test.utils import override_settings
+    >>> from autoslug.utils import get_reservation_key, get_scope_key
+    >>> model = ModelWithCacheReservation
+    >>> field = model._meta.get_field('slug')
+    >>> # another process is about to save an object with this slug
+    >>> cache.add(get_reservation_key(field, get_scope_key(()), u'hello'), 'x', 10)
+    True
+    >>> with override_settings(AUTOSLUG_RESERVATION_CACHE='default'):
+    ...     a = model.objects.create(name='Hello')
+    ...     a.save()
+    ...     b = model.objects.create(name='Hello')
+    >>> a.slug, b.slug
+    (u'hello-2', u'hello-3')
+    >>> # reservations are not checked unless told so
+    >>> model.objects.create(name='Hello').slug
+    u'hello'
+    """
+    name = CharField(max_length=200)
+    slug = AutoSlugField(populate_from='name', unique=True, unique_warning=False)
+
+
+class ModelWithUniqueWarning(Model):
+    """
+    >>> import warnings
+    >>> from autoslug import utils
+    >>> a = ModelWithUniqueWarning.objects.create(name='spam')
+    >>> b = ModelWithUniqueWarning.objects.create(name='spam')
+    >>> # Python 2 does not repeat warnings listed in the registry of the module
+    >>> utils.__dict__.pop('__warningregistry__', None) and None
+    >>> with warnings.catch_warnings(record=True) as caught:
+    ...     warnings.simplefilter('always')
+    ...     c = ModelWithUniqueWarning.objects.create(name='spam')
+    >>> str(caught[0].message) == ("Initial base slug 'spam' for instance"
+    ...                            " is yet used in %s. Adding index" % a.pk)
+    True
+    >>> str(caught[-1].message) == ("Initial base slug 'spam-2' for instance"
+    ...                             " is yet used in %s. Adding index" % b.pk)
+    True
+    >>> with warnings.catch_warnings():
+    ...     warnings.simplefilter('ignore')
+    ...     from autoslug.utils import is_warning_shown
+    ...     is_warning_shown(UserWarning)
+    False
+    >>> with warnings.catch_warnings():
+    ...     warnings.filterwarnings('ignore', message='Initial')
+    ...     is_warning_shown(UserWarning)
+    True
+    """
+    name = CharField(max_length=200)
+    slug = AutoSlugField(populate_from='name', unique=True)
+
+
+class ModelWithBatchPopulation(Model):
+    """
+    >>> model = ModelWithBatchPopulation
+    >>> field = model._meta.get_field('slug')
+    >>> day, next_day = datetime.date(2009, 9, 9), datetime.date(2009, 9, 10)
+    >>> a = model.objects.create(name='foo', date=day)
+    >>> b = model.objects.create(name='foo', date=day)
+    >>> model.objects.filter(pk=b.pk).update(slug='foo-3')
+    1
+    >>> b = model.objects.get(pk=b.pk)
+    >>> batch = [model(name='foo', date=day), model(name='foo', date=day),
+    ...          model(name='foo', date=next_day), model(name='bar', date=day),
+    ...          model(name='Foo!', date=day), b]
+    >>> [x.slug for x in field.populate_batch(batch)]
+    [u'foo-2', u'foo-4', u'foo', u'bar', u'foo-5', u'foo-3']
+    >>> created = model.objects.bulk_create(batch[:-1])
+    >>> sorted(model.objects.filter(date=day).values_list('slug', flat=True))
+    [u'bar', u'foo', u'foo-2', u'foo-3', u'foo-4', u'foo-5']
+    >>> # same as saving the instances one by one
+    >>> model.objects.all().delete()
+    >>> a = model.objects.create(name='foo', date=day)
+    >>> b = model.objects.create(name='foo', date=day)
+    >>> model.objects.filter(pk=b.pk).update(slug='foo-3')
+    1
+    >>> b = model.objects.get(pk=b.pk)
+    >>> batch = [model(name='foo', date=day), model(name='foo', date=day),
+    ...          model(name='foo', date=next_day), model(name='bar', date=day),
+    ...          model(name='Foo!', date=day), b]
+    >>> for x in batch:
+    ...     x.save()
+    >>> [x.slug for x in batch]
+    [u'foo-2', u'foo-4', u'foo', u'bar', u'foo-5', u'foo-3']
+    >>> # filling empty slugs of existing rows
+    >>> import os, tempfile
+    >>> from django.core.management import call_command
+    >>> model.objects.exclude(slug='foo-3').update(slug='')
+    6
+    >>> checkpoint = os.path.join(tempfile.mkdtemp(), 'backfill.json')
+    >>> call_command('autoslug_backfill', 'autoslug.ModelWithBatchPopulation',
+    ...     'slug', chunk_size=4, processes=1, checkpoint=checkpoint) # doctest: +ELLIPSIS
+    4 slug(s) filled, last primary key: ...
+    6 slug(s) filled, last primary key: ...
+    Filled 6 slug(s) of ModelWithBatchPopulation.slug
+    >>> [x.slug for x in model.objects.order_by('pk')]
+    [u'foo', u'foo-3', u'foo-2', u'foo-4', u'foo', u'bar', u'foo-5']
+    >>> os.path.exists(checkpoint)
+    False
+    >>> # values are only slugified in a pool if asked to
+    >>> from autoslug.management.commands.autoslug_backfill import get_pool
+    >>> get_pool(field, None) is None
+    True
+    >>> pool = get_pool(field, 2)
+    >>> pool.map(field.slugify, [u'Foo Bar', u'Baz'])
+    [u'foo-bar', u'baz']
+    >>> pool.terminate()
+    >>> model.objects.exclude(slug='foo-3').update(slug='')
+    6
+    >>> call_command('autoslug_backfill', 'autoslug.ModelWithBatchPopulation',
+    ...     'slug', processes=2) # doctest: +ELLIPSIS
+    6 slug(s) filled, last primary key: ...
+    Filled 6 slug(s) of ModelWithBatchPopulation.slug
+    >>> [x.slug for x in model.objects.order_by('pk')]
+    [u'foo', u'foo-3', u'foo-2', u'foo-4', u'foo', u'bar', u'foo-5']
+    """
+    name = CharField(max_length=200)
+    date = DateField()
+    slug = AutoSlugField(populate_from='name', unique_with='date')
+
+
 class ModelWithCallable(Model):
     """
     >>> a = ModelWithCallable.objects.create(name='larch')
@@ -253,6 +787,199 @@ class ModelWithCustomSlugifier(Model):
     slug = AutoSlugField(unique=True, slugify=custom_slugify)
 
 
+slugified_values = []
+def counting_slugify(value):
+    slugified_values.append(value)
+    return default_slugify(value)
+class ModelWithSlugifyCache(Model):
+    """
+    >>> for name in ['foo', 'bar', 'foo', 'baz', 'foo', 'bar']:
+    ...     x = ModelWithSlugifyCache.objects.create(name=name)
+    >>> slugified_values
+    ['foo', 'bar', 'baz', 'bar']
+    >>> cache = ModelWithSlugifyCache._meta.get_field('slug').slugify
+    >>> cache.hits, cache.misses, len(cache)
+    (2, 4, 2)
+    >>> cache.clear()
+    >>> cache.hits, cache.misses, len(cache)
+    (0, 0, 0)
+    """
+    name = CharField(max_length=200)
+    slug = AutoSlugField(populate_from='name', slugify=counting_slugify,
+                         slugify_cache=2)
+
+
+class ModelWithFastSlugifier(Model):
+    """
+    >>> from autoslug.utils import slugify
+    >>> values = [u'  Hello, World!  ', u'ß-Æ œ', u'foo_bar -- baz', u'-x-', u'123']
+    >>> [fast_slugify(x) for x in values] == [slugify(x) for x in values]
+    True
+    >>> ModelWithFastSlugifier.objects.create(name=u'Hello, World!').slug
+    u'hello-world'
+    """
+    name = CharField(max_length=200)
+    slug = AutoSlugField(populate_from='name', slugify=fast_slugify)
+
+
+def shouting_slugify(value):
+    return fast_slugify(value).upper()
+
+
+class ModelWithSlugifySetting(Model):
+    """
+    >>> from django.test.utils import override_settings
+    >>> with override_settings(AUTOSLUG_SLUGIFY_FUNCTION='autoslug.tests.shouting_slugify'):
+    ...     ModelWithSlugifySetting.objects.create(name=u'Hello, World!').slug
+    u'HELLO-WORLD'
+    >>> ModelWithSlugifySetting.objects.create(name=u'Hello, World!').slug
+    u'hello-world'
+    """
+    name = CharField(max_length=200)
+    slug = AutoSlugField(populate_from='name')
+
+
+class ModelWithRegeneratedSlug(Model):
+    """
+    >>> import os, tempfile
+    >>> from django.core.management import call_command
+    >>> model = ModelWithRegeneratedSlug
+    >>> for name in ['Foo', 'Foo', 'Bar']:
+    ...     x = model.objects.create(name=name)
+    >>> # e.g. the slugs were generated by another function
+    >>> model.objects.filter(slug='foo').update(slug='x-foo-2')
+    1
+    >>> model.objects.filter(slug='foo-2').update(slug='foo')
+    1
+    >>> call_command('autoslug_regenerate', 'autoslug.ModelWithRegeneratedSlug',
+    ...              'slug', dry_run=True)
+    1: x-foo-2 -> foo
+    2: foo -> foo-2
+    Would change 2 of 3 slug(s) of ModelWithRegeneratedSlug.slug
+    >>> [x.slug for x in model.objects.order_by('pk')]
+    [u'x-foo-2', u'foo', u'bar']
+    >>> mapping = os.path.join(tempfile.mkdtemp(), 'mapping.csv')
+    >>> call_command('autoslug_regenerate', 'autoslug.ModelWithRegeneratedSlug',
+    ...              'slug', mapping=mapping)
+    Changed 2 of 3 slug(s) of ModelWithRegeneratedSlug.slug
+    >>> [x.slug for x in model.objects.order_by('pk')]
+    [u'foo', u'foo-2', u'bar']
+    >>> print(open(mapping).read().strip())
+    pk,old,new
+    1,x-foo-2,foo
+    2,foo,foo-2
+    >>> # each `unique_with` scope is regenerated separately
+    >>> d1, d2 = datetime.date(2009, 9, 9), datetime.date(2009, 10, 9)
+    >>> for date in d1, d2, d1:
+    ...     x = ModelWithUniqueSlugMonth.objects.create(slug='Test Me', date=date)
+    >>> [x.slug for x in ModelWithUniqueSlugMonth.objects.filter(slug__startswith='test-me')]
+    [u'test-me', u'test-me', u'test-me-2']
+    >>> ModelWithUniqueSlugMonth.objects.filter(slug__startswith='test-me').update(slug='Test Me')
+    3
+    >>> call_command('autoslug_regenerate', 'autoslug.ModelWithUniqueSlugMonth',
+    ...              'slug') # doctest: +ELLIPSIS
+    Changed ... slug(s) of ModelWithUniqueSlugMonth.slug
+    >>> [x.slug for x in ModelWithUniqueSlugMonth.objects.filter(slug__startswith='test-me')]
+    [u'test-me', u'test-me', u'test-me-2']
+    >>> # scopes are kept in memory, so their size is limited
+    >>> from autoslug.management.commands.autoslug_regenerate import iter_scopes
+    >>> list(iter_scopes(model._meta.get_field('slug'), model, 1000, max_scope_size=2))
+    Traceback (most recent call last):
+    ...
+    CommandError: A uniqueness scope of ModelWithRegeneratedSlug.slug has more than 2 rows, see --max-scope-size
+    """
+    name = CharField(max_length=200)
+    slug = AutoSlugField(populate_from='name', unique=True)
+
+
+class RankedAuthor(Model):
+    name = CharField(max_length=200)
+    rank = IntegerField()
+
+    class Meta:
+        ordering = ['rank']
+
+
+class ModelWithRegeneratedScopes(Model):
+    """
+    >>> from django.core.management import call_command
+    >>> model = ModelWithRegeneratedScopes
+    >>> a = RankedAuthor.objects.create(name='A', rank=1)
+    >>> b = RankedAuthor.objects.create(name='B', rank=1)
+    >>> for author in a, b, a, b:
+    ...     x = model.objects.create(name='Foo', author=author)
+    >>> model.objects.update(slug='x')
+    4
+    >>> # rows are grouped by author_id, not by RankedAuthor.Meta.ordering
+    >>> call_command('autoslug_regenerate', 'autoslug.ModelWithRegeneratedScopes', 'slug')
+    Changed 4 of 4 slug(s) of ModelWithRegeneratedScopes.slug
+    >>> [(x.author.name, x.slug) for x in model.objects.order_by('author__name', 'pk')]
+    [(u'A', u'foo'), (u'A', u'foo-2'), (u'B', u'foo'), (u'B', u'foo-2')]
+    """
+    name = CharField(max_length=200)
+    author = ForeignKey(RankedAuthor)
+    slug = AutoSlugField(populate_from='name', unique_with='author')
+
+
+class ModelWithShortRegeneratedSlug(Model):
+    """
+    >>> from django.core.management import call_command
+    >>> from autoslug.management.commands.autoslug_regenerate import get_temporary_slugs
+    >>> model = ModelWithShortRegeneratedSlug
+    >>> for name in ['Foo', 'Foo', 'Foo']:
+    ...     x = model.objects.create(name=name)
+    >>> model.objects.filter(slug='foo').update(slug='x')
+    1
+    >>> model.objects.filter(slug='foo-3').update(slug='foo')
+    1
+    >>> model.objects.filter(slug='x').update(slug='foo-3')
+    1
+    >>> call_command('autoslug_regenerate', 'autoslug.ModelWithShortRegeneratedSlug', 'slug')
+    Changed 2 of 3 slug(s) of ModelWithShortRegeneratedSlug.slug
+    >>> [x.slug for x in model.objects.order_by('pk')]
+    [u'foo', u'foo-2', u'foo-3']
+    >>> # temporary slugs are cut to the length of the column
+    >>> field = model._meta.get_field('slug')
+    >>> get_temporary_slugs(field, model, 3)
+    [u'-tmp0', u'-tmp1', u'-tmp2']
+    >>> slugs = get_temporary_slugs(field, model, 2000)
+    >>> slugs[-1], max(len(x) for x in slugs), len(set(slugs))
+    (u'-t1jj', 5, 2000)
+    >>> field.max_length = 2
+    >>> get_temporary_slugs(field, model, 37)
+    Traceback (most recent call last):
+    ...
+    CommandError: ModelWithShortRegeneratedSlug.slug is too short for temporary slugs of 37 rows
+    >>> field.max_length = 5
+    """
+    name = CharField(max_length=200)
+    slug = AutoSlugField(populate_from='name', unique=True, max_length=5)
+
+
+class ModelWithSlugCostReport(Model):
+    """
+    >>> import warnings
+    >>> from autoslug.signals import slug_generated
+    >>> reports = []
+    >>> def report(sender, slug, queries, iterations, index, **kwargs):
+    ...     reports.append((str(slug), queries, iterations, index))
+    >>> slug_generated.connect(report, sender=ModelWithSlugCostReport)
+    >>> model = ModelWithSlugCostReport
+    >>> with warnings.catch_warnings():
+    ...     warnings.simplefilter('ignore')
+    ...     for x in range(0,3):
+    ...         x = model.objects.create(name='Hello')
+    >>> reports
+    [('hello', 1, 0, 1), ('hello-2', 2, 1, 2), ('hello-3', 3, 2, 3)]
+    >>> slug_generated.disconnect(report, sender=ModelWithSlugCostReport)
+    >>> x = model.objects.create(name='Hello')
+    >>> len(reports)
+    3
+    """
+    name = CharField(max_length=200)
+    slug = AutoSlugField(populate_from='name', unique=True)
+
+
 class ModelWithCustomSeparator(Model):
     """
     >>> a = ModelWithCustomSeparator.objects.create(slug='hello world!')
@@ -340,6 +1067,44 @@ class ModelWithAutoUpdateEnabled(Model):
     slug = AutoSlugField(populate_from='name', always_update=True)
 
 
+slugified_names = []
+def logging_slugify(value):
+    slugified_names.append(value)
+    return default_slugify(value)
+class ModelWithAutoUpdateSkipped(Model):
+    """
+    >>> a = ModelWithAutoUpdateSkipped.objects.create(name='My name')
+    >>> a.views += 1
+    >>> a.save()
+    >>> a = ModelWithAutoUpdateSkipped.objects.get(pk=a.pk)
+    >>> a.views += 1
+    >>> a.save()
+    >>> slugified_names
+    ['My name']
+    >>> a.name = 'My new name'
+    >>> a.save()
+    >>> a.slug
+    u'my-new-name'
+    >>> a.slug = 'manual'
+    >>> a.save()
+    >>> a.slug
+    u'my-new-name'
+    >>> slugified_names
+    ['My name', 'My new name', 'My new name']
+    >>> # an instance that was not loaded from the database is not skipped
+    >>> ModelWithAutoUpdateSkipped(pk=a.pk, name='Other name').save()
+    >>> ModelWithAutoUpdateSkipped.objects.get(pk=a.pk).slug
+    u'other-name'
+    >>> ModelWithAutoUpdateSkipped(pk=a.pk, name='Last name').save(force_update=True)
+    >>> ModelWithAutoUpdateSkipped.objects.get(pk=a.pk).slug
+    u'last-name'
+    """
+    name = CharField(max_length=200)
+    views = IntegerField(default=0)
+    slug = AutoSlugField(populate_from='name', always_update=True,
+                         slugify=logging_slugify)
+
+
 class ModelWithBlank(Model): 
     """
     >>> a = ModelWithBlank(name='')
@@ -381,6 +1146,18 @@ class ModelWithListIndex(Model):
     >>> instances = [model.objects.create(name='name', title='title') for x in range(0,4)]
     >>> [x.slug for x in model.objects.all()]
     [u'name', u'title', u'name-2', u'name-3']
+    >>> # all candidates are checked at once, "name" is not checked again
+    >>> import warnings
+    >>> from django.db import connection, reset_queries
+    >>> connection.use_debug_cursor = True
+    >>> with warnings.catch_warnings():
+    ...     warnings.simplefilter('ignore')
+    ...     model.objects.create(name='name', title='title').slug
+    u'name-4'
+    >>> [str(query['sql'].split()[0]) for query in connection.queries]
+    ['SELECT', 'SELECT', 'SELECT', 'SELECT', 'INSERT']
+    >>> connection.use_debug_cursor = None
+    >>> reset_queries()
     """
     name = CharField(max_length=200)
     title = CharField(max_length=250)
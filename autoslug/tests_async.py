@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright (c) 2008—2012 Andy Mikhailenko
+#
+#  This file is part of django-autoslug.
+#
+#  django-autoslug is free software under terms of the GNU Lesser
+#  General Public License version 3 (LGPLv3) as published by the Free
+#  Software Foundation. See the file README for copying conditions.
+#
+"""
+Tests of :mod:`autoslug.async_utils`, which needs the asynchronous queryset
+API (Django 4.1+). The doctests in :mod:`autoslug.tests` only run on older
+versions of Django, so these are plain test cases that create their own
+tables. Written without ``async def`` so that the module can be imported
+(and the tests skipped) by Python 2, e.g.::
+
+    $ django-admin test autoslug.tests_async
+"""
+
+# python
+import unittest
+
+# django
+import django
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import CASCADE, CharField, ForeignKey, Model
+from django.test import TestCase
+from django.test.utils import override_settings
+
+# this app
+from autoslug import AutoSlugField
+from autoslug.utils import get_reservation_key, get_scope_key
+
+try:
+    from asgiref.sync import async_to_sync
+    from autoslug.async_utils import apre_populate
+except (ImportError, SyntaxError):    # pragma: nocover
+    apre_populate = None
+
+
+def make_model(class_name, **fields):
+    fields.update(__module__=__name__, Meta=type('Meta', (), {'app_label': 'autoslug'}))
+    return type(class_name, (Model,), fields)
+
+
+ARTICLES = dict(
+    (strategy, make_model('AsyncArticle%s' % strategy.title(),
+                          name=CharField(max_length=200),
+                          slug=AutoSlugField(populate_from='name', unique=True,
+                                             strategy=strategy, unique_warning=False)))
+    for strategy in ('linear', 'prefix', 'gallop', 'counter', 'optimistic'))
+
+AsyncAuthor = make_model('AsyncAuthor', name=CharField(max_length=200))
+
+AsyncPost = make_model(
+    'AsyncPost',
+    name=CharField(max_length=200),
+    author=ForeignKey(AsyncAuthor, on_delete=CASCADE),
+    slug=AutoSlugField(populate_from='name', unique_with='author__name',
+                       unique_warning=False))
+
+MODELS = sorted(ARTICLES.values(), key=lambda model: model.__name__) + [AsyncAuthor, AsyncPost]
+
+
+@unittest.skipUnless(apre_populate and (4, 1) <= django.VERSION[:2],
+                     'requires the asynchronous queryset API (Django 4.1+)')
+class AsyncPrePopulateTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # the app has migrations, which do not know these models
+        with connection.schema_editor() as editor:
+            for model in MODELS:
+                editor.create_model(model)
+        super(AsyncPrePopulateTests, cls).setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super(AsyncPrePopulateTests, cls).tearDownClass()
+        with connection.schema_editor() as editor:
+            for model in reversed(MODELS):
+                editor.delete_model(model)
+
+    def populate(self, instance):
+        field = instance._meta.get_field('slug')
+        # queries are run in this thread, i.e. within the test transaction
+        return async_to_sync(field.apre_populate)(instance)
+
+    def test_strategies(self):
+        for strategy, model in sorted(ARTICLES.items()):
+            slugs = []
+            for x in range(3):
+                instance = model(name='Hello world')
+                slug = self.populate(instance)
+                instance.save()
+                slugs.append(instance.slug)
+                if strategy == 'optimistic':
+                    # left for pre_save()
+                    self.assertEqual(slug, None)
+                else:
+                    self.assertEqual(slug, instance.slug)
+            self.assertEqual(slugs, ['hello-world', 'hello-world-2', 'hello-world-3'])
+
+    def test_save_uses_populated_slug(self):
+        model = ARTICLES['linear']
+        model.objects.create(name='Hello')
+        instance = model(name='Hello')
+        self.assertEqual(self.populate(instance), 'hello-2')
+        with self.assertNumQueries(1):
+            instance.save()
+        self.assertEqual(instance.slug, 'hello-2')
+
+    def test_related_lookup(self):
+        first = AsyncAuthor.objects.create(name='Jane')
+        second = AsyncAuthor.objects.create(name='Jane')
+        AsyncPost.objects.create(name='Hello', author=first)
+        # the author is not cached on the instance, which takes a subquery
+        instance = AsyncPost(name='Hello', author_id=second.pk)
+        self.assertEqual(self.populate(instance), 'hello-2')
+        other = AsyncAuthor.objects.create(name='John')
+        instance = AsyncPost(name='Hello', author_id=other.pk)
+        self.assertEqual(self.populate(instance), 'hello')
+
+    def test_cache_reservation(self):
+        model = ARTICLES['prefix']
+        field = model._meta.get_field('slug')
+        cache.clear()
+        # another process is about to save an object with this slug
+        cache.add(get_reservation_key(field, get_scope_key(()), u'hi'), 'x', 10)
+        with override_settings(AUTOSLUG_RESERVATION_CACHE='default'):
+            instance = model(name='Hi')
+            self.assertEqual(self.populate(instance), 'hi-2')
+            instance.save()
+        self.assertEqual(instance.slug, 'hi-2')
+        cache.clear()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright (c) 2008—2012 Andy Mikhailenko
+#
+#  This file is part of django-autoslug.
+#
+#  django-autoslug is free software under terms of the GNU Lesser
+#  General Public License version 3 (LGPLv3) as published by the Free
+#  Software Foundation. See the file README for copying conditions.
+#
+"""
+Tests of the options that ``unique_with_index`` adds to models, as seen by
+migrations (Django 1.11+). Like :mod:`autoslug.tests_async`, these can be
+imported (and are skipped) on older versions of Django, e.g.::
+
+    $ django-admin test autoslug.tests_migrations
+"""
+
+# python
+import unittest
+
+# django
+import django
+from django.db import connection
+from django.db.models import CharField, Model
+from django.test import TransactionTestCase
+
+# this app
+from autoslug import AutoSlugField
+
+if (1, 11) <= django.VERSION[:2]:
+    from django.db.migrations.state import ModelState, ProjectState
+else:    # pragma: nocover
+    ModelState = ProjectState = None
+
+
+def make_model(class_name, **fields):
+    fields.update(__module__=__name__, Meta=type('Meta', (), {'app_label': 'autoslug'}))
+    return type(class_name, (Model,), fields)
+
+
+IndexedArticle = make_model(
+    'MigratedIndexedArticle',
+    name=CharField(max_length=200),
+    category=CharField(max_length=20),
+    slug=AutoSlugField(populate_from='name', unique_with='category',
+                       unique_with_index=True))
+
+UniqueArticle = make_model(
+    'MigratedUniqueArticle',
+    name=CharField(max_length=200),
+    category=CharField(max_length=20),
+    slug=AutoSlugField(populate_from='name', unique_with='category',
+                       unique_with_index='unique'))
+
+
+@unittest.skipUnless(ModelState, 'requires migrations with indexes (Django 1.11+)')
+class ScopeIndexMigrationTests(TransactionTestCase):
+
+    def get_constraints(self, model):
+        """
+        Creates the table for given model the way `migrate` would, i.e. from
+        the migration state, and returns columns of its composite indexes
+        and unique constraints.
+        """
+        project = ProjectState()
+        project.add_model(ModelState.from_model(model))
+        rendered = project.apps.get_model(model._meta.app_label, model._meta.model_name)
+        with connection.schema_editor() as editor:
+            editor.create_model(rendered)
+        try:
+            with connection.cursor() as cursor:
+                constraints = connection.introspection.get_constraints(
+                    cursor, rendered._meta.db_table)
+        finally:
+            with connection.schema_editor() as editor:
+                editor.delete_model(rendered)
+        return [(tuple(x['columns']), bool(x['unique']))
+                for x in constraints.values() if len(x['columns']) > 1]
+
+    def test_index(self):
+        state = ModelState.from_model(IndexedArticle)
+        self.assertEqual([x.fields for x in state.options['indexes']],
+                         [['category', 'slug']])
+        self.assertEqual(self.get_constraints(IndexedArticle),
+                         [(('category', 'slug'), False)])
+
+    def test_unique(self):
+        state = ModelState.from_model(UniqueArticle)
+        self.assertEqual(state.options['unique_together'],
+                         set([('category', 'slug')]))
+        self.assertEqual(self.get_constraints(UniqueArticle),
+                         [(('category', 'slug'), True)])
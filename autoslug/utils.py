@@ -9,26 +9,260 @@
 #  Software Foundation. See the file README for copying conditions.
 #
 
+from __future__ import with_statement
+
 # django
+from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
-from django.db.models.fields import FieldDoesNotExist, DateField
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F, ForeignKey, Q
+from django.db.models.query import QuerySet
+from django.db.models.fields import DateField, DateTimeField
+try:
+    from django.core.exceptions import FieldDoesNotExist
+except ImportError:    # Django < 1.8
+    from django.db.models.fields import FieldDoesNotExist
 from django.template.defaultfilters import slugify as django_slugify
-from warnings import warn
-
 try:
-    # i18n-friendly approach
-    from unidecode import unidecode
-except ImportError:
+    from django.utils.encoding import force_text
+except ImportError:    # pragma: nocover
     try:
-        # Cyrillic transliteration (primarily Russian)
-        from pytils.translit import slugify
+        # Django < 1.5
+        from django.utils.encoding import force_unicode as force_text
     except ImportError:
-        # fall back to Django's default method
-        slugify = django_slugify
-else:
-    # Use Django's default method over decoded string
-    def slugify(value):
-        return django_slugify(unidecode(value))
+        # Django >= 4.0
+        from django.utils.encoding import force_str as force_text
+try:
+    from django.utils import timezone
+except ImportError:    # Django < 1.4
+    timezone = None
+from contextlib import contextmanager
+import datetime
+from hashlib import sha1
+import re
+import struct
+import threading
+import unicodedata
+from uuid import uuid4
+import warnings
+from warnings import warn
+
+# the default slugify function and Unidecode are looked up on first use so
+# that importing models does not import the transliteration libraries
+_default_slugify = None
+_unidecode = None
+
+
+def get_unidecode():
+    """
+    Returns `unidecode.unidecode()` if Unidecode_ is installed, otherwise
+    ``None``. The module is imported on first call.
+    """
+    global _unidecode
+    if _unidecode is None:
+        try:
+            from unidecode import unidecode
+        except ImportError:
+            unidecode = False
+        _unidecode = unidecode
+    return _unidecode or None
+
+
+def get_default_slugify():
+    """
+    Returns the function used by :func:`slugify`, depending on availability
+    in given order:
+
+    * Django's `slugify()` over the string decoded by Unidecode_ (i18n-friendly);
+    * `pytils.translit.slugify()` (Cyrillic transliteration, primarily Russian);
+    * Django's `slugify()`.
+    """
+    global _default_slugify
+    if _default_slugify is None:
+        unidecode = get_unidecode()
+        if unidecode:
+            def _default_slugify(value):
+                return django_slugify(unidecode(value))
+        else:
+            try:
+                from pytils.translit import slugify as _default_slugify
+            except ImportError:
+                _default_slugify = django_slugify
+    return _default_slugify
+
+
+def slugify(value):
+    return get_default_slugify()(value)
+
+
+try:                 # pragma: nocover
+    # Python 2.x
+    basestring
+    unichr
+except NameError:    # pragma: nocover
+    # Python 3.x
+    basestring = str
+    unichr = chr
+
+
+class TranslationTable(dict):
+    """
+    A table for `unicode.translate()` that maps every character to its
+    transliterated, lowercased slug form in one go: word characters are kept,
+    whitespace is replaced with a space, other characters are dropped. Entries
+    are computed on first use (see :func:`fast_slugify`).
+    """
+    def __init__(self):
+        super(TranslationTable, self).__init__()
+        # classify ASCII characters the way Django's slugify does:
+        # "aXa" -> "axa" (kept), "a a" -> "a-a" (separator), "a!a" -> "aa"
+        self.ascii = {}
+        for code in range(128):
+            char = unichr(code)
+            slug = django_slugify(u'a%sa' % char)
+            if slug == u'a-a':
+                self.ascii[char] = u'-' if char == u'-' else u' '
+            elif len(slug) == 3:
+                self.ascii[char] = slug[1]
+            else:
+                self.ascii[char] = u''
+        # newer versions of Django also strip dashes and underscores
+        self.strip_dashes = django_slugify(u' -a- ') == u'a'
+
+    def __missing__(self, code):
+        char = unichr(code)
+        unidecode = get_unidecode()
+        if unidecode:
+            ascii = unidecode(char)
+        else:
+            ascii = unicodedata.normalize('NFKD', char).encode('ascii', 'ignore').decode('ascii')
+        result = self[code] = u''.join(self.ascii.get(c, u'') for c in ascii)
+        return result
+
+
+SEPARATORS_RE = re.compile(u'[- ]+')
+_translation_table = None
+
+
+def fast_slugify(value):
+    """
+    A faster equivalent of :func:`slugify` (when Unidecode_ is installed) and
+    Django's `slugify()` (otherwise). Instead of transliterating the string,
+    normalizing it and running regular expressions over the result, every
+    character is transliterated, filtered and lowercased at once using a
+    translation table; the only other pass collapses separators.
+
+    To use it as default, set ``AUTOSLUG_SLUGIFY_FUNCTION`` to
+    ``'autoslug.utils.fast_slugify'``.
+    """
+    global _translation_table
+    if _translation_table is None:
+        _translation_table = TranslationTable()
+    value = force_text(value).translate(_translation_table)
+    if _translation_table.strip_dashes:
+        return SEPARATORS_RE.sub(u'-', value).strip(u'-_')
+    return SEPARATORS_RE.sub(u'-', value.strip(u' '))
+
+
+# default number of values remembered by SlugifyCache
+SLUGIFY_CACHE_SIZE = 1024
+
+# how many rivals (primary keys) to list in the "slug is taken" warning
+MAX_RIVALS_IN_WARNING = 10
+
+# ways to find a free index for a taken slug, see generate_unique_slug()
+STRATEGIES = ('linear', 'prefix', 'optimistic', 'counter', 'gallop', 'lock')
+
+# how many indices are checked with one query by the gallop strategy
+GALLOP_BATCH_SIZE = 20
+
+# default number of seconds a slug stays reserved in the cache, see
+# reserve_in_cache()
+RESERVATION_TIMEOUT = 10
+
+# number of process-local locks used by the lock strategy where the database
+# has no advisory locks (slugs are spread over them by hash)
+LOCK_STRIPES = 64
+
+# how many times to retry saving with the next slug on a unique constraint
+# violation before falling back to looking for a free slug (optimistic)
+OPTIMISTIC_ATTEMPTS = 10
+
+
+class SlugifyCache(object):
+    """
+    Wraps a slugify function with a bounded cache which discards the least
+    recently used values first. Only strings are cached, other values are
+    passed to the function as is. The cache is thread-safe; the function
+    itself is called outside of the lock.
+
+    The number of cache hits and misses is available as `hits` and `misses`.
+    """
+    def __init__(self, slugify, maxsize=SLUGIFY_CACHE_SIZE):
+        self.slugify = slugify
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._links = {}
+        # circular doubly linked list of [previous, next, value, slug],
+        # the most recently used item being the last one
+        self._root = []
+        self._root[:] = [self._root, self._root, None, None]
+
+    def __call__(self, value):
+        if not isinstance(value, basestring):
+            return self.slugify(value)
+
+        root = self._root
+        self._lock.acquire()
+        try:
+            link = self._links.get(value)
+            if link is not None:
+                # move the link to the end of the list
+                previous, next, key, slug = link
+                previous[1] = next
+                next[0] = previous
+                last = root[0]
+                last[1] = root[0] = link
+                link[0] = last
+                link[1] = root
+                self.hits += 1
+                return slug
+            self.misses += 1
+        finally:
+            self._lock.release()
+
+        slug = self.slugify(value)
+
+        self._lock.acquire()
+        try:
+            if value not in self._links:
+                last = root[0]
+                link = [last, root, value, slug]
+                last[1] = root[0] = self._links[value] = link
+                if self.maxsize < len(self._links):
+                    oldest = root[1]
+                    root[1] = oldest[1]
+                    oldest[1][0] = root
+                    del self._links[oldest[2]]
+        finally:
+            self._lock.release()
+        return slug
+
+    def __len__(self):
+        return len(self._links)
+
+    def clear(self):
+        """
+        Discards all cached values and resets the counters.
+        """
+        self._lock.acquire()
+        try:
+            self._links.clear()
+            self._root[:] = [self._root, self._root, None, None]
+            self.hits = self.misses = 0
+        finally:
+            self._lock.release()
 
 
 def get_prepopulated_value(field, instance):
@@ -56,6 +290,33 @@ def get_prepopulated_value(field, instance):
         return values
 
 
+class SlugStats(object):
+    """
+    The cost of generating a slug for an instance, collected by
+    :func:`record_cost` while `AutoSlugField.pre_save` is running and then
+    sent with :data:`autoslug.signals.slug_generated`.
+    """
+    def __init__(self):
+        self.generated = False     # False if the slug was left as is
+        self.slugify_time = 0.0
+        self.queries = 0
+        self.iterations = 0
+        self.index = 1
+
+
+def record_cost(instance, queries=0, iterations=0, index=None):
+    """
+    Adds given figures to the :class:`SlugStats` of given instance, if any
+    (i.e. if someone listens to :data:`autoslug.signals.slug_generated`).
+    """
+    stats = instance.__dict__.get('_autoslug_stats')
+    if stats is not None:
+        stats.queries += queries
+        stats.iterations += iterations
+        if index is not None:
+            stats.index = index
+
+
 def generate_unique_slug(field, instance, slugs, manager):
     """
     Pick the first unique slug from given list. If none is unique generates one 
@@ -63,87 +324,958 @@ def generate_unique_slug(field, instance, slugs, manager):
     with such slug. If ``unique_with`` (a tuple of field names) was specified for 
     the field, all these fields are included together in the query when looking 
     for a "rival" model instance.
-    """
 
+    The slug is picked by the backend of the field (see
+    :mod:`autoslug.backends`). The shipped ones first check all candidates
+    with a single ``slug IN (...)`` query; the way the number is then found
+    depends on ``field.strategy``: ``linear`` probes "foo-2", "foo-3" etc.
+    one query at a time, ``prefix`` fetches all rival slugs at once (see
+    :func:`scan_for_unique_slug`), ``counter`` takes the next index from
+    a counter (see :func:`count_unique_slug`), ``gallop`` checks batches of
+    indices (see :class:`GallopingSearch`), ``lock`` works like ``prefix``
+    after locking the candidates (see :func:`lock_slugs`). The
+    ``optimistic`` strategy normally does not get here at all (see
+    :func:`get_optimistic_slug`); if it does, it works like ``prefix``.
 
+    Within a :func:`reservations` block the slugs are picked from memory
+    (except for the ``counter`` and ``lock`` strategies). The picked slug is
+    then reserved in the cache if ``AUTOSLUG_RESERVATION_CACHE`` is set (see
+    :func:`reserve_in_cache`).
+    """
     default_lookups = tuple(get_uniqueness_lookups(field, instance, field.unique_with))
 
-    index = 1
-
     if not manager:
         manager = type(instance).objects
 
-    for add_index in [False, True]: 
-        for slug in slugs: 
-            original_slug = slug = crop_slug(field, slug)
-            # keep changing the slug until it is unique
+    slugs = [crop_slug(field, slug) for slug in slugs]
+
+    backend = field.get_backend()
+    registries = getattr(_reservations, 'registries', None)
+    if registries is not None and backend.uses_reservations:
+        slug = reserve_unique_slug(field, instance, slugs, manager,
+                                   default_lookups, registries)
+    else:
+        slug = backend.allocate(field, instance, slugs, default_lookups)
+
+    if getattr(settings, 'AUTOSLUG_RESERVATION_CACHE', None):
+        slug = reserve_in_cache(field, instance, slugs, slug, manager, default_lookups)
+    return slug
+
+
+def generate_unique_slugs(field, items, manager):
+    """
+    Batch counterpart of :func:`generate_unique_slug`. `items` is a list of
+    ``(instance, slugs)`` pairs; each instance gets the slug it would get if
+    the instances were saved one by one in given order.
+
+    Instances are grouped by their ``unique_with`` lookups. For each group the
+    rival slugs are fetched at once (``slug LIKE 'foo%'`` for every distinct
+    base) and the slugs are then picked in memory, so that instances of the
+    same batch do not clash with each other.
+    """
+    groups = {}
+    for instance, slugs in items:
+        lookups = tuple(get_uniqueness_lookups(field, instance, field.unique_with))
+        key = type(instance), lookups
+        if key not in groups:
+            groups[key] = []
+        groups[key].append((instance, [crop_slug(field, s) for s in slugs]))
+
+    for (model, lookups), group in groups.items():
+        rivals = (manager or model.objects).filter(**dict(lookups))
+        registry = SlugRegistry(field, rivals)
+        registry.load(set(registry.get_family(slugs[0]) for x, slugs in group)
+                      | set(s for x, slugs in group for s in slugs[1:]))
+        for instance, slugs in group:
+            slug = registry.allocate(instance.pk, slugs)
+            setattr(instance, field.name, slug)
+
+
+# registries of slugs allocated within a reservations() block by scope
+_reservations = threading.local()
+
+
+@contextmanager
+def reservations():
+    """
+    Remembers the slugs allocated by saves within the block, so that saving
+    many objects with the same base slug (e.g. tags from an import form)
+    does not query the database for the whole chain of indices again and
+    again::
+
+        with autoslug.reservations():
+            for name in names:
+                Tag.objects.create(name=name)
+
+    The slugs taken in each uniqueness scope are fetched once (like in
+    `AutoSlugField.populate_batch`) and every slug picked afterwards is
+    registered in memory; the search for a free index continues from the
+    last one allocated for the same base slug. Fields with the ``counter``
+    strategy are not affected.
+
+    The reservations are dropped when the block is left, also with an
+    exception. Changes made within the block by other means (e.g. deleted
+    objects, a transaction rolled back inside the block) are not seen, so
+    some indices may be skipped; rows saved concurrently by other processes
+    are still caught by the unique constraint only. Nested blocks share the
+    reservations of the outermost one. The reservations are thread-local
+    and are not used by `AutoSlugField.apre_populate`.
+    """
+    if getattr(_reservations, 'registries', None) is not None:
+        yield
+        return
+    _reservations.registries = {}
+    try:
+        yield
+    finally:
+        _reservations.registries = None
+
+
+def reserve_unique_slug(field, instance, slugs, manager, lookups, registries):
+    """
+    Picks a unique slug like :func:`generate_unique_slug` does using the
+    :class:`SlugRegistry` of the scope from given registries (see
+    :func:`reservations`).
+    """
+    key = get_model_label(field.model), field.name, get_scope_key(lookups)
+    registry = registries.get(key)
+    if registry is None:
+        registry = registries[key] = SlugRegistry(field, manager.filter(**dict(lookups)))
+
+    queries = registry.queries
+    if instance.pk is not None:
+        registry.claim(instance.pk, getattr(instance, field.attname))
+    slug = registry.allocate(instance.pk, slugs)
+    record_cost(instance, queries=registry.queries - queries)
+    if slug not in slugs:
+        record_cost(instance, index=registry.indices[slugs[0]])
+        if field.unique_warning:
+            # rows saved within the block are registered without a key
+            pks = [pk for pk in registry.owners.get(slugs[0], [])
+                   if not registry.is_new(pk)]
+            warn_slug_used(instance, slugs[0], pks or [u'this block'])
+    return slug
+
+
+def reserve_in_cache(field, instance, slugs, slug, manager, lookups):
+    """
+    Reserves given free slug in the cache defined by
+    ``AUTOSLUG_RESERVATION_CACHE`` for ``AUTOSLUG_RESERVATION_TIMEOUT``
+    seconds (10 by default) with an atomic `add()`, so that other processes
+    that are about to save an object with the same slug in the same scope
+    pick another one instead of failing on the unique constraint (or, with
+    `unique_with`, saving a duplicate). If the slug is reserved by someone
+    else, the next candidate or index that is neither taken nor reserved is
+    returned instead.
+
+    Any cache shared by the processes will do: the local-memory cache for
+    threads of one process, the file-based cache for processes of one host,
+    memcached, Redis or the database cache for several hosts. This only
+    makes collisions unlikely; it is not a lock (see the ``lock`` strategy).
+    """
+    if instance.pk is not None and slug == field.value_from_object(instance):
+        # the object already has this slug
+        return slug
+
+    cache = get_cache(settings.AUTOSLUG_RESERVATION_CACHE)
+    timeout = getattr(settings, 'AUTOSLUG_RESERVATION_TIMEOUT', RESERVATION_TIMEOUT)
+    # identifies the instance, so that saving it again keeps the reservation
+    token = instance.__dict__.setdefault('_autoslug_token', uuid4().hex)
+    scope = get_scope_key(lookups)
+    rivals = manager.filter(**dict(lookups)).exclude(pk=instance.pk)
+
+    if slug in slugs:
+        following = slugs[slugs.index(slug) + 1:]
+        index = 1
+    else:
+        following = []
+        index = split_indexed_slug(field, slug)[1]
+    while True:
+        key = get_reservation_key(field, scope, slug)
+        if cache.add(key, token, timeout) or cache.get(key) == token:
+            return slug
+
+        # someone is about to save another object with this slug
+        while True:
+            if following:
+                slug = following.pop(0)
+            else:
+                index += 1
+                slug = get_indexed_slug(field, slugs[0], index)
+            record_cost(instance, queries=1, iterations=1, index=index)
+            if not rivals.filter(**{field.name: slug}).exists():
+                break
+
+
+def get_reservation_key(field, scope, slug):
+    """
+    Returns the cache key for reserving given slug of given field within
+    given scope (see :func:`get_scope_key`).
+    """
+    key = u'%s.%s:%s:%s' % (get_model_label(field.model), field.name, scope, slug)
+    return 'autoslug:%s' % sha1(key.encode('utf-8')).hexdigest()
+
+
+def get_cache(alias):
+    try:
+        from django.core.cache import caches
+    except ImportError:    # Django < 1.7
+        from django.core.cache import get_cache
+        return get_cache(alias)
+    return caches[alias]
+
+
+class SlugRegistry(object):
+    """
+    In-memory view of the slugs taken within a uniqueness scope. Rows are
+    loaded from `rivals` (a queryset) by prefix; slugs allocated via
+    :meth:`allocate` are registered as taken, so that subsequent allocations
+    behave as if previous instances had already been saved.
+    """
+    # max number of prefixes per query
+    chunk_size = 300
+
+    def __init__(self, field, rivals):
+        self.field = field
+        self.rivals = rivals
+        self.owners = {}      # slug -> list of primary keys
+        self.slugs = {}       # primary key -> slug
+        self.loaded = set()   # prefixes for which all rivals are known
+        self.allocated = set()  # primary keys of rows with a new slug
+        self.indices = {}     # base slug -> last allocated index
+        self.queries = 0
+
+    def get_family(self, slug):
+        """
+        Returns the prefix shared by `slug` and all of its indexed variants
+        that fit into the first digit of the index ("foo" for "foo-2").
+        """
+        return get_indexed_slug(self.field, slug, 2)[:-1 - len(self.field.index_sep)]
+
+    def load(self, prefixes):
+        """
+        Fetches all rival slugs that start with any of given prefixes.
+        """
+        name = self.field.name
+        prefixes = sorted(set(prefixes) - self.loaded)
+        for i in range(0, len(prefixes), self.chunk_size):
+            query = Q()
+            for prefix in prefixes[i:i + self.chunk_size]:
+                query |= Q(**{'%s__startswith' % name: prefix})
+            for pk, slug in self.rivals.filter(query).values_list('pk', name):
+                if pk not in self.allocated and pk not in self.slugs:
+                    self.owners.setdefault(slug, []).append(pk)
+                    self.slugs[pk] = slug
+            self.queries += 1
+        self.loaded.update(prefixes)
+
+    def is_loaded(self, slug):
+        return any(slug[:i] in self.loaded for i in range(len(slug) + 1))
+
+    def is_free(self, slug, pk):
+        if not self.is_loaded(slug):
+            self.load([slug])
+        owners = self.owners.get(slug, [])
+        # an instance does not compete with its own row
+        return all(pk is not None and owner == pk for owner in owners)
+
+    def allocate(self, pk, slugs):
+        """
+        Picks a slug for an instance with given primary key exactly like
+        :func:`generate_unique_slug` does and registers it as taken.
+        """
+        for slug in slugs:
+            if self.is_free(slug, pk):
+                break
+        else:
+            # lower indices are still taken unless a slug has been released
+            index = self.indices.get(slugs[0], 2)
+            while True:
+                slug = get_indexed_slug(self.field, slugs[0], index)
+                if not self.is_loaded(slug):
+                    # the base has been cropped to fit a longer index
+                    self.load([slug[:-len(str(index))]])
+                if self.is_free(slug, pk):
+                    break
+                index += 1
+            self.indices[slugs[0]] = index
+        self.register(pk, slug)
+        return slug
+
+    def register(self, pk, slug):
+        if pk is None:
+            # a new row; just make sure the slug is not picked again
+            pk = object()
+        if pk in self.slugs:
+            # the row gives up its previous slug
+            self.owners[self.slugs[pk]].remove(pk)
+            self.indices.clear()
+        self.owners.setdefault(slug, []).append(pk)
+        self.slugs[pk] = slug
+        self.allocated.add(pk)
+
+    def release(self, pk):
+        """
+        Frees the slug of the row with given primary key, if known.
+        """
+        if pk in self.slugs:
+            self.owners[self.slugs.pop(pk)].remove(pk)
+            self.indices.clear()
+
+    def is_new(self, pk):
+        return type(pk) is object
+
+    def claim(self, pk, slug):
+        """
+        Hands a slug registered for a new row (see :meth:`register`) over to
+        the primary key of the row once it has been saved.
+        """
+        if pk in self.slugs:
+            return
+        owners = self.owners.get(slug, [])
+        for i, owner in enumerate(owners):
+            if self.is_new(owner):
+                owners[i] = pk
+                del self.slugs[owner]
+                self.slugs[pk] = slug
+                self.allocated.add(pk)
+                return
+
+
+def count_unique_slug(field, instance, slug, manager, lookups):
+    """
+    Returns given (taken) slug with the next index taken from
+    a :class:`~autoslug.models.SlugCounter` for given model, field, scope and
+    slug. The counter is incremented with a single ``UPDATE``, so
+    the cost does not depend on the number of existing slugs. If there is no
+    counter yet, it is created from the highest index in use.
+
+    Note that unlike other strategies this one never reuses indices freed
+    by deleted objects. Requires ``autoslug`` in ``INSTALLED_APPS``.
+    """
+    from autoslug.models import SlugCounter
+
+    rivals = manager.filter(**dict(lookups)).exclude(pk=instance.pk)
+    name = field.name
+
+    using = rivals.db
+    key = dict(model=get_model_label(rivals.model), field=name,
+               scope=get_scope_key(lookups), slug=slug)
+    counters = SlugCounter.objects.using(using).filter(**key)
+    while True:
+        record_cost(instance, queries=2, iterations=1)
+        with atomic(using):
+            if counters.update(index=F('index') + 1):
+                index = counters.values_list('index', flat=True)[0]
+            else:
+                index = get_highest_index(field, rivals, slug) + 1
+                record_cost(instance, queries=1)
+                sid = transaction.savepoint(using=using)
+                try:
+                    SlugCounter.objects.using(using).create(index=index, **key)
+                except IntegrityError:
+                    # created by someone else in the meantime
+                    transaction.savepoint_rollback(sid, using=using)
+                    continue
+                transaction.savepoint_commit(sid, using=using)
+        candidate = get_indexed_slug(field, slug, index)
+        # the slug may have been taken bypassing the counter
+        record_cost(instance, queries=1)
+        if not rivals.filter(**{name: candidate}).exists():
+            record_cost(instance, index=index)
+            return candidate
+
+
+def get_highest_index(field, rivals, slug):
+    """
+    Returns the highest index of given slug used by `rivals` (1 if only the
+    slug itself is used, 0 if it is not used at all).
+    """
+    prefix = get_indexed_slug(field, slug, 2)[:-1]
+    query = Q(**{field.name: slug}) | Q(**{'%s__startswith' % field.name: prefix})
+    highest = 0
+    for rival in rivals.filter(query).values_list(field.name, flat=True):
+        base, index = split_indexed_slug(field, rival)
+        if rival == get_indexed_slug(field, slug, index) or rival == slug:
+            highest = max(highest, index)
+    return highest
+
+
+def split_indexed_slug(field, slug):
+    """
+    Returns the base and the index of given slug, e.g. ``('foo', 2)`` for
+    "foo-2" and ``('foo', 1)`` for "foo". Note that the base may have been
+    cropped to fit the index.
+    """
+    base, sep, index = slug.rpartition(field.index_sep)
+    if sep and base and index.isdigit() and index[0] != '0' and 1 < int(index):
+        return base, int(index)
+    return slug, 1
+
+
+def get_scope_key(lookups):
+    """
+    Returns a short string that identifies the uniqueness scope described by
+    given lookups (as returned by :func:`get_uniqueness_lookups`).
+    """
+    parts = []
+    for name, value in sorted(lookups):
+        if isinstance(value, QuerySet):
+            # a subquery for a value of a related object (see UniquenessPlan)
+            name = name[:-len('__in')]
+            value = u','.join(force_text(x) for x in value)
+        value = getattr(value, 'pk', value)
+        parts.append(u'%s=%s' % (name, force_text(value)))
+    return sha1(u'&'.join(parts).encode('utf-8')).hexdigest()
+
+
+def get_model_label(model):
+    return '%s.%s' % (model._meta.app_label, model._meta.object_name)
+
+
+def atomic(using=None):
+    """
+    Returns `transaction.atomic()` in Django >= 1.6. In older versions
+    queries outside of transaction management are committed one by one
+    (e.g. by `QuerySet.update()`), so the block is run with
+    `transaction.commit_on_success()` unless transactions are already
+    managed, in which case it is part of the enclosing transaction (which
+    would be committed early by a nested `commit_on_success()`).
+    """
+    if hasattr(transaction, 'atomic'):
+        return transaction.atomic(using=using)
+    if transaction.is_managed(using=using):
+        return _nothing()
+    return transaction.commit_on_success(using=using)
+
+
+@contextmanager
+def _nothing():
+    yield
+
+
+def savepoint(using=None):
+    """
+    Returns a context manager that rolls back the changes made within the
+    block if it raises an exception: `transaction.atomic()` in Django >= 1.6,
+    which also restores the state of an enclosing atomic block after an
+    error has passed through `Model.save_base()`, or a raw savepoint in
+    older versions.
+    """
+    if hasattr(transaction, 'atomic'):
+        return transaction.atomic(using=using)
+    return _raw_savepoint(using)
+
+
+@contextmanager
+def _raw_savepoint(using):
+    sid = transaction.savepoint(using=using)
+    try:
+        yield
+    except Exception:
+        transaction.savepoint_rollback(sid, using=using)
+        raise
+    else:
+        transaction.savepoint_commit(sid, using=using)
+
+
+def rebuild_slug_counters(field, model, chunk_size=1000):
+    """
+    Replaces all counters for given field with ones computed from the slugs
+    currently stored in the database. Returns the number of counters.
+    """
+    from autoslug.models import SlugCounter
+
+    manager = field.manager or model._default_manager
+    label = get_model_label(manager.model)
+    highest = {}
+    chunk = []
+    for instance in manager.all().iterator():
+        chunk.append(instance)
+        if len(chunk) == chunk_size:
+            _count_indices(field, chunk, highest)
+            chunk = []
+    _count_indices(field, chunk, highest)
+
+    counters = [SlugCounter(model=label, field=field.name, scope=scope,
+                            slug=slug, index=index)
+                for (scope, slug), index in highest.items() if 1 < index]
+    using = manager.db
+    with atomic(using):
+        SlugCounter.objects.using(using).filter(model=label, field=field.name).delete()
+        SlugCounter.objects.using(using).bulk_create(counters)
+    return len(counters)
+
+
+def _count_indices(field, instances, highest):
+    if field.unique_with:
+        prime_related_objects(field, instances)
+    for instance in instances:
+        slug = getattr(instance, field.attname)
+        if not slug:
+            continue
+        lookups = tuple(get_uniqueness_lookups(field, instance, field.unique_with))
+        base, index = split_indexed_slug(field, slug)
+        key = get_scope_key(lookups), base
+        highest[key] = max(highest.get(key, 0), index)
+
+
+def get_model_field(label, field_name):
+    """
+    Returns the model and the field for given label (e.g. "blog.Article") and
+    field name. Raises `ValueError` if either cannot be found.
+    """
+    try:
+        from django.apps import apps
+        get_model = apps.get_model
+    except ImportError:    # Django < 1.7
+        from django.db.models import get_model
+    try:
+        app_label, model_name = label.split('.')
+        model = get_model(app_label, model_name)
+    except (ValueError, LookupError):
+        model = None
+    if model is None:
+        raise ValueError('Unknown model "%s"' % label)
+    try:
+        field = model._meta.get_field(field_name)
+    except FieldDoesNotExist:
+        raise ValueError('Unknown field %s.%s' % (model._meta.object_name, field_name))
+    return model, field
+
+
+def get_optimistic_slug(field, instance, slugs):
+    """
+    Returns the slug to try saving the instance with, without querying the
+    database. The first attempt uses the first candidate; every time the save
+    fails due to a unique constraint violation (see
+    :func:`retry_on_slug_conflict`) the next candidate and then the first
+    candidate with the next index is tried. After ``OPTIMISTIC_ATTEMPTS``
+    failed attempts a free slug is looked up as usual.
+    """
+    attempt = getattr(instance, '_autoslug_attempts', {}).get(field.attname, 0)
+    if OPTIMISTIC_ATTEMPTS <= attempt:
+        return generate_unique_slug(field, instance, slugs, field.manager)
+    if attempt < len(slugs):
+        return slugs[attempt]
+    index = attempt - len(slugs) + 2
+    record_cost(instance, iterations=index - 1, index=index)
+    return get_indexed_slug(field, slugs[0], index)
+
+
+def retry_on_slug_conflict(save_base):
+    """
+    Wraps `Model.save_base()` so that a save that violates the unique
+    constraint of an optimistic AutoSlugField is rolled back (see
+    :func:`savepoint`) and retried with the next slug (see
+    :func:`get_optimistic_slug`).
+    """
+    def wrapper(instance, *args, **kwargs):
+        if kwargs.get('cls') is not None or kwargs.get('raw'):
+            # saving a parent model (Django < 1.8) or loading a fixture
+            return save_base(instance, *args, **kwargs)
+
+        using = kwargs.get('using') or router.db_for_write(type(instance), instance=instance)
+        fields = [f for f in instance._meta.fields
+                  if getattr(f, 'strategy', None) == 'optimistic']
+        initial = [(f.attname, getattr(instance, f.attname)) for f in fields]
+        instance._autoslug_attempts = attempts = {}
+        try:
             while True:
-                # find instances with same slug
-                lookups = dict(default_lookups, **{field.name: slug})
-                rivals = manager.filter(**lookups).exclude(pk=instance.pk)
-
-                if not rivals:
-                    # the slug is unique, no model uses it
-                    return slug
-                elif field.unique_warning: 
-                    sr = u''
-                    for r in rivals: 
-                        sr = u"%s'%s %s' and " % (sr, r.pk, r)
-                    sr = sr.rstrip(u' and ')
-                    warn("Initial base slug '%s' for %s is yet used in %s. Adding index" % (slug.encode('utf-8'), instance.pk or 'instance', sr.encode('utf-8')))
-
-                if add_index: 
-                    # the slug is not unique; change once more
-                    index += 1
-
-                    # ensure the resulting string is not too long
-                    tail_length = len(field.index_sep) + len(str(index))
-                    combined_length = len(original_slug) + tail_length
-                    if field.max_length < combined_length:
-                        original_slug = original_slug[:field.max_length - tail_length]
-
-                    # re-generate the slug
-                    data = dict(slug=original_slug, sep=field.index_sep, index=index)
-                    slug = u'%(slug)s%(sep)s%(index)d' % data
-                    # ...next iteration...
-                else: 
-                    break 
-
-
-def get_uniqueness_lookups(field, instance, unique_with):
+                for attname, value in initial:
+                    setattr(instance, attname, value)
+                try:
+                    with savepoint(using):
+                        result = save_base(instance, *args, **kwargs)
+                except IntegrityError:
+                    conflicts = [f for f in fields if is_slug_taken(f, instance)]
+                    if not conflicts or OPTIMISTIC_ATTEMPTS < min(attempts.get(f.attname, 0) for f in conflicts):
+                        raise
+                    for f in conflicts:
+                        attempts[f.attname] = attempts.get(f.attname, 0) + 1
+                else:
+                    return result
+        finally:
+            del instance._autoslug_attempts
+
+    wrapper.retries_on_slug_conflict = True
+    return wrapper
+
+
+_lock_stripes = [threading.RLock() for i in range(LOCK_STRIPES)]
+
+
+def lock_slugs(field, instance, slugs, lookups, using):
+    """
+    Locks given candidate slugs (and thus their indexed variants) within the
+    uniqueness scope described by `lookups` until the instance is saved, so
+    that concurrent saves of instances with the same base slug pick their
+    slugs one after another. Instances with other slugs are not affected.
+
+    On PostgreSQL a transaction-level advisory lock is taken for each slug,
+    keyed on a hash of the model, field, scope and slug. Other databases
+    have no such locks; a process-local lock is taken instead, i.e. only
+    threads of the same process are serialized. The locks are released by
+    the wrapper installed by :func:`lock_slug_allocation` once the object is
+    saved, which within an outer transaction is before the new row becomes
+    visible to other threads: they may then pick the same slug. Releasing
+    them on commit instead is not an option as nothing would release them if
+    the transaction were rolled back.
+    """
+    scope = get_scope_key(lookups)
+    keys = sorted(set(get_lock_key(field, scope, slug) for slug in slugs))
+    if connections[using].vendor == 'postgresql':
+        cursor = connections[using].cursor()
+        for key in keys:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [key])
+        record_cost(instance, queries=len(keys))
+        return
+
+    held = instance.__dict__.get('_autoslug_locks')
+    if held is None:
+        # not saved through the wrapper; there is nothing to release the
+        # lock once the instance is saved
+        return
+    # always acquire stripes in the same order to avoid deadlocks
+    for stripe in sorted(set(key % LOCK_STRIPES for key in keys)):
+        lock = _lock_stripes[stripe]
+        lock.acquire()
+        held.append(lock)
+
+
+def get_lock_key(field, scope, slug):
+    """
+    Returns a signed 64-bit integer identifying given slug of given field
+    within given scope (see :func:`get_scope_key`).
+    """
+    key = u'%s.%s:%s:%s' % (get_model_label(field.model), field.name, scope, slug)
+    return struct.unpack('>q', sha1(key.encode('utf-8')).digest()[:8])[0]
+
+
+def lock_slug_allocation(save_base):
+    """
+    Wraps `Model.save_base()` so that the slugs of AutoSlugFields whose
+    backend locks them (see :class:`autoslug.backends.LockBackend`) are
+    picked and saved within a single transaction and the locks taken by
+    :func:`lock_slugs` are held until it is over. Unless the save is wrapped
+    in an outer transaction, that is when the row is committed. Models
+    whose fields use other backends are saved as is.
+    """
+    def wrapper(instance, *args, **kwargs):
+        if kwargs.get('cls') is not None or kwargs.get('raw'):
+            # saving a parent model (Django < 1.8) or loading a fixture
+            return save_base(instance, *args, **kwargs)
+        if not _locks_slugs(type(instance)):
+            return save_base(instance, *args, **kwargs)
+
+        using = kwargs.get('using') or router.db_for_write(type(instance), instance=instance)
+        instance._autoslug_locks = held = []
+        try:
+            with atomic(using):
+                return save_base(instance, *args, **kwargs)
+        finally:
+            del instance._autoslug_locks
+            for lock in reversed(held):
+                lock.release()
+
+    wrapper.locks_slug_allocation = True
+    return wrapper
+
+
+def _locks_slugs(model):
+    from autoslug.backends import get_slug_fields
+    return any(field.get_backend().locks_slugs for field in get_slug_fields(model))
+
+
+def is_slug_taken(field, instance):
+    """
+    Returns ``True`` if another object uses the slug of given instance.
+    """
+    manager = field.manager or type(instance).objects
+    lookups = {field.name: getattr(instance, field.attname)}
+    return manager.filter(**lookups).exclude(pk=instance.pk).exists()
+
+
+def warn_slug_taken(instance, slug, rivals):
+    """
+    Warns that `slug` is used by `rivals` (a queryset). The primary keys of
+    at most ``MAX_RIVALS_IN_WARNING`` rivals are fetched to build the message,
+    and only if the warning is not going to be filtered out anyway.
+    """
+    if not is_warning_shown(UserWarning):
+        return
+    pks = list(rivals.values_list('pk', flat=True)[:MAX_RIVALS_IN_WARNING + 1])
+    record_cost(instance, queries=1)
+    warn_slug_used(instance, slug, pks)
+
+
+def warn_slug_used(instance, slug, pks):
+    """
+    Issues the warning for :func:`warn_slug_taken` given the primary keys of
+    the rivals (at most ``MAX_RIVALS_IN_WARNING + 1``).
+    """
+    sr = u', '.join(u'%s' % pk for pk in pks[:MAX_RIVALS_IN_WARNING])
+    if MAX_RIVALS_IN_WARNING < len(pks):
+        sr = u'%s and more' % sr
+    warn(u"Initial base slug '%s' for %s is yet used in %s. Adding index" % (slug, instance.pk or u'instance', sr))
+
+
+def is_warning_shown(category):
+    """
+    Returns ``False`` if a warning of given category issued by this module
+    would be ignored by current warning filters, ``True`` if it would be shown
+    or if that cannot be told without knowing the text of the message.
+    """
+    for action, message, filter_category, module, lineno in warnings.filters:
+        if not issubclass(category, filter_category):
+            continue
+        if module is not None and not module.match(__name__):
+            continue
+        if lineno or (message is not None and message.pattern):
+            # depends on the line or the text; just build the message
+            return True
+        return action != 'ignore'
+    return warnings.defaultaction != 'ignore'
+
+
+def scan_for_unique_slug(field, instance, slug, manager, lookups):
+    """
+    Returns given (taken) slug with the lowest free index appended, i.e.
+    exactly what the probing loop in :func:`generate_unique_slug` would
+    return.
+
+    Instead of one query per index, all rival slugs matching the base
+    (``slug LIKE 'foo-%'``) are fetched at once and the free index is picked
+    in Python.  Another query is only issued if the base has to be cropped to
+    make room for a longer index (see ``max_length``).
+    """
+    rivals = manager.filter(**dict(lookups)).exclude(pk=instance.pk)
+    name = field.name
+
+    index = 2
+    prefix = get_indexed_slug(field, slug, index)[:-len(str(index))]
+    known_prefixes = set([prefix])
+
+    lookup = {'%s__startswith' % name: prefix}
+    taken = set(rivals.filter(**lookup).values_list(name, flat=True))
+    record_cost(instance, queries=1)
+
+    while True:
+        candidate = get_indexed_slug(field, slug, index)
+        prefix = candidate[:-len(str(index))]
+        if prefix not in known_prefixes:
+            # the base was cropped to fit the index; fetch the new family
+            known_prefixes.add(prefix)
+            lookup = {'%s__startswith' % name: prefix}
+            taken.update(rivals.filter(**lookup).values_list(name, flat=True))
+            record_cost(instance, queries=1)
+        record_cost(instance, iterations=1)
+        if candidate not in taken:
+            record_cost(instance, index=index)
+            return candidate
+        index += 1
+
+
+def gallop_for_unique_slug(field, instance, slug, manager, lookups):
+    """
+    Returns given (taken) slug with a free index appended, found by
+    :class:`GallopingSearch` with one ``slug IN (...)`` query per batch.
+    """
+    rivals = manager.filter(**dict(lookups)).exclude(pk=instance.pk)
+    name = field.name
+
+    search = GallopingSearch(field, slug)
+    while search.result is None:
+        candidates = search.get_candidates()
+        lookup = {'%s__in' % name: candidates}
+        search.update(rivals.filter(**lookup).values_list(name, flat=True))
+        record_cost(instance, queries=1, iterations=len(candidates))
+    index, slug = search.result
+    record_cost(instance, index=index)
+    return slug
+
+
+class GallopingSearch(object):
+    """
+    Finds a free index for a taken slug in a logarithmic number of queries
+    without relying on ``LIKE`` (see the ``prefix`` strategy).
+
+    First indices 2, 3, 5, 9, 17 etc. are checked ("galloping") until a free
+    one is found; then the range between the last taken index and the free
+    one is narrowed down by checking evenly spaced indices within it until
+    the free index right after a taken one is known. Each step checks up to
+    `batch_size` indices at once: the caller queries the slugs returned by
+    :meth:`get_candidates` and passes the taken ones to :meth:`update` until
+    `result` (a tuple of the index and the slug) is set.
+
+    Every index is converted to a slug with :func:`get_indexed_slug`, so the
+    base may be cropped as the index grows (see ``max_length``). Note that
+    if some indices below the highest one are free (e.g. the objects were
+    deleted), the found index is not necessarily the lowest free one.
+    """
+    def __init__(self, field, slug, batch_size=GALLOP_BATCH_SIZE):
+        self.field = field
+        self.slug = slug
+        self.batch_size = batch_size
+        self.low = 1        # highest index known to be taken (1 is the slug itself)
+        self.high = None    # lowest index known to be free
+        self.result = None
+        self._indices = {}
+
+    def get_candidates(self):
+        if self.high is None:
+            # gallop: low + 1, low + 2, low + 4, ...
+            indices = [self.low + 2 ** i for i in range(self.batch_size)]
+        elif self.high - self.low - 1 <= self.batch_size:
+            indices = list(range(self.low + 1, self.high))
+        else:
+            span = self.high - self.low
+            indices = sorted(set(self.low + span * i // (self.batch_size + 1)
+                                 for i in range(1, self.batch_size + 1)))
+        self._indices = dict((get_indexed_slug(self.field, self.slug, index), index)
+                             for index in indices)
+        return list(self._indices)
+
+    def update(self, taken):
+        taken = set(taken)
+        for slug, index in sorted(self._indices.items(), key=lambda x: x[1]):
+            if slug in taken:
+                self.low = index
+            else:
+                self.high = index
+                break
+        if self.high is not None and self.high - self.low == 1:
+            self.result = (self.high,
+                           get_indexed_slug(self.field, self.slug, self.high))
+
+
+def get_uniqueness_lookups(field, instance, unique_with, local=False):
     """
     Returns a dict'able tuple of lookups to ensure uniqueness of a slug.
+
+    If `local` is ``True``, lookups that span a foreign key (e.g.
+    ``"author__name"``) are replaced with the value of the key (``author``),
+    so that they can be told apart without a query; note that such scopes
+    are narrower than the actual ones.
     """
-    for original_lookup_name in unique_with:
+    plan = get_uniqueness_plan(field, type(instance), unique_with)
+    return plan.get_lookups(instance, local=local)
+
+
+def get_uniqueness_plan(field, model, unique_with):
+    """
+    Returns a :class:`UniquenessPlan` for given field, model and `unique_with`.
+    Plans are compiled on first use and cached on the field, so the model
+    meta is only inspected once.
+    """
+    key = model, tuple(unique_with)
+    try:
+        return field._uniqueness_plans[key]
+    except KeyError:
+        plan = field._uniqueness_plans[key] = UniquenessPlan(field, model, unique_with)
+        return plan
+
+
+def get_remote_field(field):
+    """
+    Returns the relation descriptor of given field (``remote_field`` in newer
+    versions of Django, ``rel`` in older ones) or ``None``.
+    """
+    rel = getattr(field, 'remote_field', None)    # Django >= 1.9
+    if rel is None:
+        rel = getattr(field, 'rel', None)
+    return rel
+
+
+def get_related_model(field):
+    """
+    Returns the model referenced by given relation field or ``None`` if the
+    field is not a relation.
+    """
+    rel = get_remote_field(field)
+    if rel is None:
+        return None
+    return getattr(rel, 'model', None) or rel.to
+
+
+def get_cached_related(field, instance):
+    """
+    Returns the object referenced by given foreign key if it is already
+    cached on the instance, otherwise ``None`` (i.e. never hits the database).
+    """
+    if hasattr(field, 'is_cached'):    # Django >= 2.0
+        if field.is_cached(instance):
+            return field.get_cached_value(instance)
+        return None
+    return getattr(instance, field.get_cache_name(), None)
+
+
+class UniquenessStep(object):
+    """
+    A single resolved item of `unique_with`, see :class:`UniquenessPlan`.
+    """
+    def __init__(self, name, field, date_parts=None, inner_plan=None):
+        self.name = name
+        self.field = field
+        self.date_parts = date_parts
+        self.inner_plan = inner_plan
+        self.is_foreign_key = isinstance(field, ForeignKey)
+        if self.is_foreign_key:
+            rel = get_remote_field(field)
+            self.related_model = get_related_model(field)
+            self.target_name = rel.get_related_field().attname
+
+        # name of the related field if the lookup can be expressed as
+        # a subquery on the foreign key column (e.g. "author__name" ->
+        # "author__name__in=<names of authors with pk=author_id>"); only
+        # for required fields because empty values are treated specially
+        self.subquery_name = None
+        if self.is_foreign_key and inner_plan and len(inner_plan.steps) == 1:
+            inner = inner_plan.steps[0]
+            if not (inner.date_parts or inner.inner_plan or inner.is_foreign_key
+                    or inner.field.blank or inner.field.null):
+                self.subquery_name = inner.name
+
+
+class UniquenessPlan(object):
+    """
+    The `unique_with` constraint of a field resolved against a model: the
+    referenced fields, date parts and relations are looked up once, so that
+    getting the lookups for an instance only involves reading its attributes.
+
+    Lookups that span a foreign key do not load the related object unless
+    it is needed: ``unique_with='author'`` uses the value of ``author_id``,
+    and ``unique_with='author__name'`` uses the cached author if any or
+    otherwise a subquery on ``author_id``.
+
+    Raises `ValueError` if the constraint is misconfigured.
+    """
+    def __init__(self, field, model, unique_with):
+        self.field = field
+        self.model = model
+        self.steps = [self._compile(name) for name in unique_with]
+
+    def _compile(self, original_lookup_name):
+        field, opts = self.field, self.model._meta
+
         if '__' in original_lookup_name:
             field_name, inner_lookup = original_lookup_name.split('__', 1)
         else:
             field_name, inner_lookup = original_lookup_name, None
 
         try:
-            other_field = instance._meta.get_field(field_name)
+            other_field = opts.get_field(field_name)
         except FieldDoesNotExist:
             raise ValueError('Could not find attribute %s.%s referenced'
                              ' by %s.%s (see constraint `unique_with`)'
-                             % (instance._meta.object_name, field_name,
-                                instance._meta.object_name, field.name))
+                             % (opts.object_name, field_name,
+                                opts.object_name, field.name))
 
         if field == other_field:
             raise ValueError('Attribute %s.%s references itself in `unique_with`.'
                              ' Please use "unique=True" for this case.'
-                             % (instance._meta.object_name, field_name))
+                             % (opts.object_name, field_name))
 
-        value = getattr(instance, field_name)
-        if not value:
-            if other_field.blank:
-                break
-            raise ValueError('Could not check uniqueness of %s.%s with'
-                             ' respect to %s.%s because the latter is empty.'
-                             ' Please ensure that "%s" is declared *after*'
-                             ' all fields listed in unique_with.'
-                             % (instance._meta.object_name, field.name,
-                                instance._meta.object_name, field_name,
-                                field.name))
         if isinstance(other_field, DateField):    # DateTimeField is a DateField subclass
             inner_lookup = inner_lookup or 'day'
 
@@ -152,7 +1284,7 @@ def get_uniqueness_lookups(field, instance, unique_with):
                                  ' is set to "%s", but AutoSlugField only'
                                  ' accepts one level of nesting for dates'
                                  ' (e.g. "date__month").'
-                                 % (instance._meta.object_name, field.name,
+                                 % (opts.object_name, field.name,
                                     original_lookup_name))
 
             parts = ['year', 'month', 'day']
@@ -161,55 +1293,268 @@ def get_uniqueness_lookups(field, instance, unique_with):
             except ValueError:
                 raise ValueError('expected one of %s, got "%s" in "%s"'
                                     % (parts, inner_lookup, original_lookup_name))
+            return UniquenessStep(field_name, other_field,
+                                  date_parts=parts[:granularity])
+
+        if inner_lookup:
+            # the lookup spans a relation; resolve the rest against the
+            # related model
+            related_model = get_related_model(other_field)
+            if related_model is None:
+                raise ValueError('Could not resolve lookup "%s" in `unique_with` of %s.%s'
+                                 % (original_lookup_name, opts.object_name, field.name))
+            inner_plan = get_uniqueness_plan(field, related_model, [inner_lookup])
+            return UniquenessStep(field_name, other_field, inner_plan=inner_plan)
+
+        return UniquenessStep(field_name, other_field)
+
+    def get_lookups(self, instance, local=False):
+        """
+        Yields lookups (name and value) for given instance (see
+        :func:`get_uniqueness_lookups` for `local`).
+        """
+        for step in self.steps:
+            field_name = step.name
+            inner_plan = step.inner_plan
+            if step.is_foreign_key and local:
+                value = getattr(instance, step.field.attname)
+                inner_plan = None
+            elif step.is_foreign_key:
+                value = get_cached_related(step.field, instance)
+                if value is None:
+                    value = getattr(instance, step.field.attname)
+                    if value is not None and step.inner_plan:
+                        if step.subquery_name:
+                            related = step.related_model._base_manager.filter(
+                                **{step.target_name: value})
+                            lookup = '%s__%s__in' % (field_name, step.subquery_name)
+                            yield lookup, related.values_list(step.subquery_name, flat=True)
+                            continue
+                        # no way around fetching the related object
+                        value = getattr(instance, field_name)
+                elif not step.inner_plan:
+                    value = getattr(instance, step.field.attname)
             else:
-                for part in parts[:granularity]:
-                    lookup = '%s__%s' % (field_name, part)
-                    yield lookup, getattr(value, part)
-        else:
-            # TODO: this part should be documented as it involves recursion
-            if inner_lookup:
-                if not hasattr(value, '_meta'):
-                    raise ValueError('Could not resolve lookup "%s" in `unique_with` of %s.%s'
-                                     % (original_lookup_name, instance._meta.object_name, field.name))
-                for inner_name, inner_value in get_uniqueness_lookups(field, value, [inner_lookup]):
-                    yield original_lookup_name, inner_value
+                value = getattr(instance, field_name)
+            if value is None or (not value and not step.is_foreign_key):
+                if step.field.blank:
+                    break
+                raise ValueError('Could not check uniqueness of %s.%s with'
+                                 ' respect to %s.%s because the latter is empty.'
+                                 ' Please ensure that "%s" is declared *after*'
+                                 ' all fields listed in unique_with.'
+                                 % (instance._meta.object_name, self.field.name,
+                                    instance._meta.object_name, field_name,
+                                    self.field.name))
+            if step.date_parts:
+                # a range rather than "date__year=..." etc. so that the
+                # index on the column can be used
+                start, end = get_date_range(step.field, value, len(step.date_parts))
+                yield '%s__gte' % field_name, start
+                yield '%s__lt' % field_name, end
+            elif inner_plan:
+                for inner_name, inner_value in inner_plan.get_lookups(value):
+                    yield '%s__%s' % (field_name, inner_name), inner_value
             else:
                 yield field_name, value
 
 
+def get_date_range(field, value, granularity):
+    """
+    Returns the beginning of the year, month or day (`granularity` 1, 2 or 3)
+    of given date or datetime and the beginning of the next one, as values
+    of given date field.
+
+    With ``USE_TZ`` the values of a `DateTimeField` are split into days in
+    the current time zone, just like the ``__year``, ``__month`` and
+    ``__day`` lookups do.
+    """
+    is_datetime = isinstance(field, DateTimeField)
+    aware = is_datetime and timezone is not None and getattr(settings, 'USE_TZ', False)
+    if isinstance(value, datetime.datetime):
+        if aware:
+            if timezone.is_naive(value):
+                value = timezone.make_aware(value, timezone.get_default_timezone())
+            value = timezone.localtime(value)
+        value = value.date()
+
+    if granularity == 1:
+        start = datetime.date(value.year, 1, 1)
+        end = datetime.date(value.year + 1, 1, 1)
+    elif granularity == 2:
+        start = datetime.date(value.year, value.month, 1)
+        if value.month == 12:
+            end = datetime.date(value.year + 1, 1, 1)
+        else:
+            end = datetime.date(value.year, value.month + 1, 1)
+    else:
+        start = value
+        end = value + datetime.timedelta(days=1)
+
+    if not is_datetime:
+        return start, end
+    start, end = [datetime.datetime(x.year, x.month, x.day) for x in (start, end)]
+    if aware:
+        current = timezone.get_current_timezone()
+        start, end = [timezone.make_aware(x, current) for x in (start, end)]
+    return start, end
+
+
+def get_scope_index_fields(field, model, unique=False):
+    """
+    Returns names of the fields to build a composite index for the lookups
+    of given field upon (see ``unique_with_index``): fields compared for
+    equality, the slug and fields compared by range, in this order. Lookups
+    that span relations are skipped. If `unique` is true, raises
+    `ValueError` unless the index can enforce the uniqueness of the slug.
+    """
+    # related models may not be loaded yet, so the lookups are not resolved
+    # with get_uniqueness_plan()
+    equal, ranged = [], []
+    for lookup in field.unique_with:
+        name, _, inner_lookup = lookup.partition('__')
+        other_field = model._meta.get_field(name)
+        if isinstance(other_field, DateField):
+            if inner_lookup in ('', 'day') and not isinstance(other_field, DateTimeField):
+                equal.append(name)
+                continue
+            ranged.append(name)
+            skipped = 'is a date range'
+        elif inner_lookup:
+            skipped = 'spans a relation'
+        else:
+            equal.append(name)
+            continue
+        if unique:
+            raise ValueError('AutoSlugField %s.%s cannot be unique together with'
+                             ' its `unique_with` because "%s" %s.'
+                             % (model._meta.object_name, field.name, lookup, skipped))
+    return equal + [field.name] + ranged
+
+
+def add_scope_index(field, model, unique=False):
+    """
+    Adds the composite index described by :func:`get_scope_index_fields` to
+    the options of given model, or the fields to `unique_together` if
+    `unique` is true.
+    """
+    names = tuple(get_scope_index_fields(field, model, unique))
+    opts = model._meta
+    if unique:
+        if names not in [tuple(x) for x in opts.unique_together]:
+            _set_model_option(opts, 'unique_together',
+                              tuple(opts.unique_together) + (names,))
+    elif hasattr(opts, 'indexes'):    # Django >= 1.11
+        from django.db.models import Index
+        if names not in [tuple(x.fields) for x in opts.indexes]:
+            index = Index(fields=list(names))
+            index.set_name_with_model(model)
+            _set_model_option(opts, 'indexes', list(opts.indexes) + [index])
+    elif hasattr(opts, 'index_together'):    # Django >= 1.5
+        if names not in [tuple(x) for x in opts.index_together]:
+            _set_model_option(opts, 'index_together',
+                              tuple(opts.index_together) + (names,))
+    else:
+        warn('Composite indexes are not supported by this version of Django;'
+             ' %s.%s only has an index on its own column.'
+             % (opts.object_name, field.name))
+
+
+def _set_model_option(opts, name, value):
+    setattr(opts, name, value)
+    # the migration autodetector only looks at options declared in Meta
+    if hasattr(opts, 'original_attrs'):    # Django >= 1.7
+        opts.original_attrs[name] = value
+
+
+def prime_related_objects(field, instances, related_objects=None):
+    """
+    Caches the objects referenced by `unique_with` lookups that span a foreign
+    key (e.g. ``"author__name"``) on given instances, so that getting their
+    lookups needs no query per instance. `related_objects` may map names of
+    foreign keys to already fetched objects keyed by the value of the key
+    (i.e. the result of `QuerySet.in_bulk()` for keys to primary keys); all
+    other objects are fetched with one query per foreign key.
+    """
+    related_objects = related_objects or {}
+    models = {}
+    for instance in instances:
+        models.setdefault(type(instance), []).append(instance)
+    for model, group in models.items():
+        plan = get_uniqueness_plan(field, model, field.unique_with)
+        _prime_related_objects(plan, group, related_objects)
+
+
+def _prime_related_objects(plan, instances, related_objects):
+    for step in plan.steps:
+        if not (step.is_foreign_key and step.inner_plan):
+            continue
+        known = dict(related_objects.get(step.name, {}))
+        missing = set()
+        for instance in instances:
+            if get_cached_related(step.field, instance) is None:
+                value = getattr(instance, step.field.attname)
+                if value is not None and value not in known:
+                    missing.add(value)
+        if missing:
+            lookup = '%s__in' % step.target_name
+            for obj in step.related_model._base_manager.filter(**{lookup: missing}):
+                known[getattr(obj, step.target_name)] = obj
+        related = []
+        for instance in instances:
+            obj = get_cached_related(step.field, instance)
+            if obj is None:
+                obj = known.get(getattr(instance, step.field.attname))
+                if obj is None:
+                    continue
+                setattr(instance, step.name, obj)
+            related.append(obj)
+        # the related objects may in turn reference other ones
+        _prime_related_objects(step.inner_plan, related, {})
+
+
 def crop_slug(field, slug):
     if field.max_length < len(slug):
         return slug[:field.max_length]
     return slug
 
 
-try:
-    import translitcodec
-except ImportError:
-    pass
-else:
-    import re
-    PUNCT_RE = re.compile(r'[\t !"#$%&\'()*\-/<=>?@\[\\\]^_`{|},.]+')
-
-    def translitcodec_slugify(codec):
-        def _slugify(value, delim=u'-', encoding=''):
-            """
-            Generates an ASCII-only slug.
-
-            Borrowed from http://flask.pocoo.org/snippets/5/
-            """
-            if encoding:
-                encoder = "%s/%s" % (codec, encoding)
-            else:
-                encoder = codec
-            result = []
-            for word in PUNCT_RE.split(value.lower()):
-                word = word.encode(encoder)
-                if word:
-                    result.append(word)
-            return unicode(delim.join(result))
-        return _slugify
-
-    translit_long = translitcodec_slugify("translit/long")
-    translit_short = translitcodec_slugify("translit/short")
-    translit_one = translitcodec_slugify("translit/one")
+def get_indexed_slug(field, slug, index):
+    """
+    Returns the slug with given index appended (e.g. "foo-2"). The slug is
+    cropped as needed so that the result fits into ``field.max_length``.
+    """
+    tail = u'%s%d' % (field.index_sep, index)
+    if field.max_length < len(slug) + len(tail):
+        slug = slug[:field.max_length - len(tail)]
+    return slug + tail
+
+
+PUNCT_RE = re.compile(r'[\t !"#$%&\'()*\-/<=>?@\[\\\]^_`{|},.]+')
+
+
+def translitcodec_slugify(codec):
+    def _slugify(value, delim=u'-', encoding=''):
+        """
+        Generates an ASCII-only slug.
+
+        Borrowed from http://flask.pocoo.org/snippets/5/
+        """
+        # registers the codecs; imported here so that the library is only
+        # required (and loaded) if one of these functions is selected
+        import translitcodec
+        if encoding:
+            encoder = "%s/%s" % (codec, encoding)
+        else:
+            encoder = codec
+        result = []
+        for word in PUNCT_RE.split(value.lower()):
+            word = word.encode(encoder)
+            if word:
+                result.append(word)
+        return unicode(delim.join(result))
+    return _slugify
+
+translit_long = translitcodec_slugify("translit/long")
+translit_short = translitcodec_slugify("translit/short")
+translit_one = translitcodec_slugify("translit/one")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compares the default slugify function (Unidecode + Django's slugify) with
+the translation table based `autoslug.utils.fast_slugify`.
+
+Usage::
+
+    ./benchmarks/slugify.py [number of repetitions]
+
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from django.conf import settings
+
+settings.configure()
+
+from autoslug import utils
+
+
+CORPUS = [
+    u'Hello world!',
+    u'The Quick Brown Fox Jumps Over The Lazy Dog',
+    u'  Déjà vu: a café in Zürich, São Paulo & Kraków  ',
+    u'Ελληνικά για αρχάριους',
+    u'Привет, мир! Новости дня — 15 октября',
+    u'北京欢迎你 2012',
+    u'Straße — Ærøskøbing – Œuvre ﬁnale',
+    u'foo_bar -- baz\t\tqux\nquux',
+    u'C++ / C# / F#: 10 reasons why (part 2)',
+    u'',
+]
+
+
+def main(number=10000):
+    if not utils.get_unidecode():
+        print('Unidecode is not installed; comparing with Django slugify.')
+
+    for value in CORPUS:
+        assert utils.slugify(value) == utils.fast_slugify(value), value
+
+    results = []
+    for func in utils.slugify, utils.fast_slugify:
+        # warm up (the translation table is filled on first use)
+        for value in CORPUS:
+            func(value)
+        timer = timeit.Timer(lambda: [func(value) for value in CORPUS])
+        best = min(timer.repeat(repeat=3, number=number))
+        per_call = best / (number * len(CORPUS)) * 1e6
+        results.append(per_call)
+        print('%-15s %8.2f us per value' % (func.__name__, per_call))
+
+    print('speedup: %.1fx' % (results[0] / results[1]))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:2]])
@@ -19,7 +19,8 @@ readme = open(os.path.join(os.path.dirname(__file__), 'README')).read()
 setup(
     name     = 'django-autoslug',
     version  = '1.7.1',  # also update doc/conf.py:version
-    packages = ['autoslug'],
+    packages = ['autoslug', 'autoslug.management', 'autoslug.management.commands',
+                'autoslug.migrations'],
 
     requires = ['python (>= 2.5)', 'django (>= 1.0)'],
     # in case you want to use slugify() with support for transliteration: